@@ -77,6 +77,7 @@ class GSPointPen(SegmentToPointPen):
 			baseName = baseName.name
 		_Component = GSComponent(baseName, transform=transformation)
 		self._layer.addComponent_(_Component)
+		self._glyph._invalidateMetrics()
 	
 	def closePath(self):
 		if self._path is not None:
@@ -0,0 +1,98 @@
+"""The Glyphs side of the Glyphs import and export."""
+# -*- coding: utf-8 -*-
+#
+# Finds the Glyphs application and the Glyphs folder of the user and loads the
+# glyph data and the weight codes from there into glyphsConvert. With PyObjC the
+# application is found by its bundle identifier; without it (in the batch
+# converter on other systems) the usual install locations are tried.
+#
+#	loadGlyphsInfo()
+#	importGlyphsDocument(Font, readGlyphsDocument(Path))
+
+import os
+import plistlib
+
+import glyphsConvert
+
+try:
+	from AppKit import NSWorkspace
+	from Foundation import NSSearchPathForDirectoriesInDomains, NSApplicationSupportDirectory, NSUserDomainMask, NSDictionary
+except ImportError:
+	NSWorkspace = None
+
+__all__ = ["glyphsAppPath", "applicationSupportFolder", "glyphDataPaths", "weightCodesPath", "loadGlyphsInfo"]
+
+BundleIdentifiers = ("com.GeorgSeifert.Glyphs", "com.schriftgestaltung.Glyphs", "com.schriftgestaltung.GlyphsMini")
+AppPaths = ("/Applications/Glyphs.app", "/Applications/Glyphs Mini.app", "~/Applications/Glyphs.app")
+ResourcesFolder = "Contents/Frameworks/GlyphsCore.framework/Versions/A/Resources"
+
+def glyphsAppPath():
+	"""Return the path of the Glyphs application, or None."""
+	if NSWorkspace is not None:
+		for Identifier in BundleIdentifiers:
+			URL = NSWorkspace.sharedWorkspace().URLForApplicationWithBundleIdentifier_(Identifier)
+			if URL is not None:
+				return URL.path()
+		return None
+	for Path in AppPaths:
+		Path = os.path.expanduser(Path)
+		if os.path.isdir(Path):
+			return Path
+	return None
+
+def applicationSupportFolder(appname=u"Glyphs"):
+	"""Return the Application Support folder of Glyphs of the user, or None."""
+	BasePath = None
+	if NSWorkspace is not None:
+		Paths = NSSearchPathForDirectoriesInDomains(NSApplicationSupportDirectory, NSUserDomainMask, True)
+		if len(Paths) > 0:
+			BasePath = Paths[0]
+	if BasePath is None:
+		BasePath = os.path.expanduser("~/Library/Application Support")
+	FullPath = os.path.join(BasePath, appname)
+	if not os.path.exists(FullPath):
+		return None
+	return FullPath
+
+def glyphDataPaths():
+	"""Return the GlyphData.xml of the application and the one of the user, those that exist."""
+	Paths = []
+	AppPath = glyphsAppPath()
+	if AppPath is not None:
+		Paths.append(os.path.join(AppPath, ResourcesFolder, "GlyphData.xml"))
+	CustomPath = applicationSupportFolder()
+	if CustomPath is not None:
+		Paths.append(os.path.join(CustomPath, "Info", "GlyphData.xml"))
+	return [Path for Path in Paths if os.path.isfile(Path)]
+
+def weightCodesPath():
+	AppPath = glyphsAppPath()
+	if AppPath is None:
+		return None
+	Path = os.path.join(AppPath, ResourcesFolder, "weights.plist")
+	if not os.path.isfile(Path):
+		return None
+	return Path
+
+def _readWeightCodes(Path):
+	if NSWorkspace is not None:
+		return NSDictionary.alloc().initWithContentsOfFile_(Path)
+	try:
+		return plistlib.readPlist(Path)
+	except Exception:
+		# an old style plist, only Foundation reads those
+		return None
+
+def loadGlyphsInfo():
+	"""Load the glyph data and weight codes of the installed Glyphs into glyphsConvert. Returns False if Glyphs is not found."""
+	Paths = glyphDataPaths()
+	if len(Paths) == 0:
+		return False
+	for Path in Paths:
+		glyphsConvert.parseGlyphDataFile(Path)
+	Path = weightCodesPath()
+	if Path is not None:
+		WeightCodes = _readWeightCodes(Path)
+		if WeightCodes is not None:
+			glyphsConvert.weightCodes = WeightCodes
+	return True
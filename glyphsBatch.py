@@ -0,0 +1,151 @@
+"""Convert many .glyphs files at once, without FontLab."""
+# -*- coding: utf-8 -*-
+#
+#	python glyphsBatch.py ~/Fonts/Family/ -o ~/Fonts/Converted --glyphdata GlyphData.xml
+#	python glyphsBatch.py "~/Fonts/*/*.glyphs" --jobs 4
+#
+# Each file is imported in its own worker process with the in-memory FontLab
+# stand-in and written as a .json dump of the font. A failing file does not
+# stop the others.
+
+import os
+import sys
+import glob
+import time
+import tempfile
+import traceback
+import multiprocessing
+from StringIO import StringIO
+
+import memoryFL
+import glyphsConvert
+from glyphsFormat import readGlyphsDocument
+from glyphsFL import importGlyphsDocument
+from glyphsStats import Stats
+from glyphsApp import glyphDataPaths
+
+__all__ = ["findGlyphsFiles", "convertFile", "convertFiles"]
+
+def findGlyphsFiles(Patterns):
+	"""Return the .glyphs files in the given directories, files and glob patterns."""
+	Paths = []
+	for Pattern in Patterns:
+		Pattern = os.path.expanduser(Pattern)
+		if os.path.isdir(Pattern):
+			Found = glob.glob(os.path.join(Pattern, "*.glyphs"))
+		else:
+			Found = glob.glob(Pattern)
+		for Path in sorted(Found):
+			if Path not in Paths:
+				Paths.append(Path)
+	return Paths
+
+def outputPath(Path, OutputFolder=None):
+	Folder, Name = os.path.split(Path)
+	if OutputFolder is not None:
+		Folder = OutputFolder
+	return os.path.join(Folder, os.path.splitext(Name)[0] + ".json")
+
+def _saveFont(Font, Path):
+	# write to a temporary file first, so a failed or interrupted conversion never leaves half a file
+	Handle, TempPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(Path)))
+	os.close(Handle)
+	try:
+		Font.Save(TempPath)
+		os.chmod(TempPath, 0644)
+		os.rename(TempPath, Path)
+	except:
+		os.remove(TempPath)
+		raise
+
+def convertFile(Path, OutputFolder=None, GlyphDataPaths=()):
+	"""Convert one .glyphs file. Returns a dict with the result, it never raises."""
+	Result = {"path": Path, "output": outputPath(Path, OutputFolder), "error": None}
+	Statistics = Stats(os.path.basename(Path))
+	Output = StringIO()
+	stdout = sys.stdout
+	sys.stdout = Output
+	try:
+		try:
+			for GlyphDataPath in GlyphDataPaths:
+				glyphsConvert.parseGlyphDataFile(GlyphDataPath)
+			with Statistics.stage("readGlyphsDocument"):
+				GlyphsDoc = readGlyphsDocument(Path)
+			try:
+				Font = memoryFL.Font()
+				if not importGlyphsDocument(Font, GlyphsDoc, Statistics):
+					raise ValueError("The font can not be converted.")
+			finally:
+				GlyphsDoc.close()
+			with Statistics.stage("write"):
+				_saveFont(Font, Result["output"])
+		except Exception, e:
+			Result["error"] = "%s: %s" % (e.__class__.__name__, e)
+			Result["traceback"] = traceback.format_exc()
+	finally:
+		sys.stdout = stdout
+	Result["messages"] = Output.getvalue()
+	Result["statistics"] = Statistics.summary()
+	return Result
+
+def _convertFile(Arguments):
+	return convertFile(*Arguments)
+
+def convertFiles(Paths, OutputFolder=None, GlyphDataPaths=(), Jobs=None):
+	"""Convert the files in parallel. Yields the result of each file as it is done.
+
+	Every file gets a fresh worker process, so the memory of a large font is returned
+	to the system when it is done.
+	"""
+	if OutputFolder is not None and not os.path.isdir(OutputFolder):
+		os.makedirs(OutputFolder)
+	Pool = multiprocessing.Pool(Jobs, maxtasksperchild=1)
+	try:
+		for Result in Pool.imap_unordered(_convertFile, [(Path, OutputFolder, GlyphDataPaths) for Path in Paths]):
+			yield Result
+		Pool.close()
+	except:
+		Pool.terminate()
+		raise
+	finally:
+		Pool.join()
+
+def main(Arguments=None):
+	import argparse
+	Parser = argparse.ArgumentParser(description="Convert .glyphs files without FontLab.")
+	Parser.add_argument("paths", nargs="+", help="folders, .glyphs files or glob patterns")
+	Parser.add_argument("-o", "--output", help="folder for the converted files, next to the .glyphs files by default")
+	Parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes, one per CPU by default")
+	Parser.add_argument("--glyphdata", action="append", default=[], help="a GlyphData.xml for the legacy names and glyph categories, those of an installed Glyphs by default")
+	Parser.add_argument("-v", "--verbose", action="store_true", help="print the messages of the conversion")
+	Options = Parser.parse_args(Arguments)
+
+	GlyphDataPaths = Options.glyphdata
+	if len(GlyphDataPaths) == 0:
+		GlyphDataPaths = glyphDataPaths()
+	Paths = findGlyphsFiles(Options.paths)
+	if len(Paths) == 0:
+		print "No .glyphs files found."
+		return 1
+	print "Converting %d files" % len(Paths)
+	StartTime = time.time()
+	Failed = []
+	for Result in convertFiles(Paths, Options.output, GlyphDataPaths, Options.jobs):
+		Name = os.path.basename(Result["path"])
+		Summary = Result["statistics"]
+		if Result["error"] is None:
+			print "%-40s %8.2f s    %d glyphs" % (Name, Summary["time"], Summary["counters"].get("glyphs", 0))
+		else:
+			print "%-40s %8.2f s    FAILED: %s" % (Name, Summary["time"], Result["error"])
+			Failed.append(Result)
+		if Options.verbose and len(Result["messages"]) > 0:
+			print "    " + Result["messages"].strip().replace("\n", "\n    ")
+	print "%d files in %.2f s, %d failed" % (len(Paths), time.time() - StartTime, len(Failed))
+	for Result in Failed:
+		print "\n%s\n%s" % (Result["path"], Result["traceback"])
+	if len(Failed) > 0:
+		return 1
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
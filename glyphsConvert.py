@@ -0,0 +1,1010 @@
+"""The host independent part of the Glyphs <-> FontLab conversion."""
+# -*- coding: utf-8 -*-
+#
+# Everything here works on the plain dicts of a .glyphs file and on the small
+# record classes below. A record holds one glyph as FontLab sees it: one node
+# per on-curve point with the points of all masters. The FontLab side
+# (glyphsFL.py) only copies records into FontLab glyphs and back.
+
+import os
+import marshal
+import tempfile
+import hashlib
+import colorsys
+import re
+import sys
+from collections import defaultdict
+
+from glyphsFormat import decodeNodes, nodeReferences, nodeReferenceMap
+import glyphsFormat
+
+__all__ = ["GlyphRecord", "NodeRecord", "ComponentRecord", "HintRecord", "LinkRecord", "AnchorRecord",
+	"MOVE", "LINE", "CURVE", "NotNiceName", "isNonSpacingMark", "parseGlyphDataFile", "indexLayers",
+	"glyphRecord", "resolveComponents", "componentOrder", "flattenComponents", "kerningGroups", "kerningClasses",
+	"kerningPairs", "featurePrefixCode", "classCodes", "featureCodes", "glyphDict", "pathDicts",
+	"kerningClassKeys", "classDict", "featureCode", "featureDict", "readGlyphRecords", "kerningClassString", "recordHash",
+	"readGlyphRecord", "fontHash", "kerningHash", "legacyNames"]
+
+# node types of a NodeRecord
+MOVE, LINE, CURVE = "move", "line", "curve"
+
+convertName = True
+Nice2Legacy = {}
+Name2Category = {}
+Name2SubCategory = {}
+weightCodes = {}
+
+Color2Mark = [5, 18, 29, 44, 63, 85, 139, 166, 195, 234, 0, 0]
+
+class NodeRecord(object):
+	"""A FontLab node. points holds a list of points for each master: [on-curve] or [on-curve, offcurve 1, offcurve 2].
+
+	The Points list is used for the first master, the other masters get a copy.
+	"""
+
+	__slots__ = ("type", "smooth", "points")
+
+	def __init__(self, Type, Points, MasterCount=1, Smooth=False):
+		self.type = Type
+		self.smooth = Smooth
+		self.points = [Points]
+		for masterIndex in range(1, MasterCount):
+			self.points.append(Points[:])
+
+	def __repr__(self):
+		return "<NodeRecord %s %s>" % (self.type, self.points[0])
+
+class ComponentRecord(object):
+	"""A component. transforms holds (scale x, scale y, delta x, delta y) for each master."""
+
+	__slots__ = ("name", "transforms")
+
+	def __init__(self, Name, Transforms):
+		self.name = Name
+		self.transforms = Transforms
+
+	def __repr__(self):
+		return "<ComponentRecord %s %s>" % (self.name, self.transforms[0])
+
+class HintRecord(object):
+
+	__slots__ = ("positions", "widths")
+
+	def __init__(self, Position, Width, MasterCount=1):
+		self.positions = [Position] * MasterCount
+		self.widths = [Width] * MasterCount
+
+class LinkRecord(object):
+	"""A link between two nodes, given by the index of the node. -1 and -2 are the ghost targets "up" and "down"."""
+
+	__slots__ = ("node1", "node2")
+
+	def __init__(self, Node1, Node2):
+		self.node1 = Node1
+		self.node2 = Node2
+
+class AnchorRecord(object):
+
+	__slots__ = ("name", "positions")
+
+	def __init__(self, Name, Position, MasterCount=1):
+		self.name = Name
+		self.positions = [Position] * MasterCount
+
+class GlyphRecord(object):
+	"""One glyph with all masters."""
+
+	def __init__(self, Name, MasterCount=1):
+		self.name = Name
+		self.masterCount = MasterCount
+		self.unicode = None
+		self.exported = True
+		self.mark = 0
+		self.widths = [0] * MasterCount
+		self.nodes = []
+		self.background = None
+		self.components = []
+		self.hhints = []
+		self.vhints = []
+		self.hlinks = []
+		self.vlinks = []
+		self.anchors = []
+		self.leftKerningGroup = None
+		self.rightKerningGroup = None
+
+	def __repr__(self):
+		return "<GlyphRecord %s>" % self.name
+
+# the legacy names that were already looked up, for each value of convertName. Cleared when Nice2Legacy changes.
+_LegacyNames = {}
+
+def _notNiceName(Name):
+	Suffix = ""
+	if "." in Name:
+		Name, Suffix = Name.split(".", 1)
+	if convertName and Name in Nice2Legacy:
+		Name = Nice2Legacy[Name]
+	else:
+		Name = Name.replace("-", "")
+	if len(Suffix) > 0:
+		Name = Name + "." + Suffix
+	return Name
+
+def _legacyNameCache():
+	Cache = _LegacyNames.get(convertName)
+	if Cache is None or len(Cache) > 100000:
+		Cache = _LegacyNames[convertName] = {}
+	return Cache
+
+def NotNiceName(Name):
+	Cache = _legacyNameCache()
+	LegacyName = Cache.get(Name)
+	if LegacyName is None:
+		LegacyName = Cache[Name] = _notNiceName(Name)
+	return LegacyName
+
+def legacyNames(Names):
+	"""Return the legacy names for the glyph names. They are kept for the later lookups with NotNiceName."""
+	Cache = _legacyNameCache()
+	LegacyNames = map(Cache.get, Names)
+	if None in LegacyNames:
+		for i in range(len(Names)):
+			if LegacyNames[i] is None:
+				LegacyNames[i] = Cache[Names[i]] = _notNiceName(Names[i])
+	return LegacyNames
+
+def isNonSpacingMark(Name):
+	try:
+		Category = Name2Category[Name]
+		SubCategory = Name2SubCategory[Name]
+	except:
+		try:
+			Name = Name[:Name.find(".")]
+			Category = Name2Category[Name]
+			SubCategory = Name2SubCategory[Name]
+		except:
+			return False
+
+	return Category == "Mark" and SubCategory == "Nonspacing"
+
+# GlyphData.xml
+
+GlyphDataCacheVersion = 1
+
+def cacheFolder():
+	Folder = os.path.expanduser("~/Library/Caches")
+	if not os.path.isdir(Folder):
+		Folder = tempfile.gettempdir()
+	Folder = os.path.join(Folder, "GlyphsImport")
+	if not os.path.isdir(Folder):
+		os.makedirs(Folder)
+	return Folder
+
+def _glyphDataCachePath(Path):
+	if isinstance(Path, unicode):
+		Path = Path.encode("utf-8")
+	Name = hashlib.md5(Path).hexdigest()
+	return os.path.join(cacheFolder(), "GlyphData-%s.marshal" % Name)
+
+def _readGlyphDataCache(CachePath, Key):
+	try:
+		File = open(CachePath, "rb")
+		try:
+			Version, CacheKey, Data = marshal.load(File)
+		finally:
+			File.close()
+	except (IOError, EOFError, ValueError, TypeError):
+		return None
+	if Version != GlyphDataCacheVersion or CacheKey != Key:
+		return None
+	return Data
+
+def _writeGlyphDataCache(CachePath, Key, Data):
+	# write to a temporary file first, so a parallel import never reads half a cache
+	try:
+		Handle, TempPath = tempfile.mkstemp(dir=os.path.dirname(CachePath))
+		File = os.fdopen(Handle, "wb")
+		try:
+			marshal.dump((GlyphDataCacheVersion, Key, Data), File)
+		finally:
+			File.close()
+		os.rename(TempPath, CachePath)
+	except (IOError, OSError):
+		pass
+
+def _parseGlyphData(Path):
+	try:
+		from xml.etree import cElementTree as ET
+	except ImportError:
+		from xml.etree import ElementTree as ET
+	Legacy = {}
+	Categories = {}
+	SubCategories = {}
+	for Event, Element in ET.iterparse(Path):
+		Attribs = Element.attrib
+		if "name" in Attribs:
+			Name = Attribs["name"]
+			if "legacy" in Attribs:
+				Legacy[Name] = Attribs["legacy"]
+			if "category" in Attribs:
+				Categories[Name] = Attribs["category"]
+			if "subCategory" in Attribs:
+				SubCategories[Name] = Attribs["subCategory"]
+		Element.clear()
+	return Legacy, Categories, SubCategories
+
+def parseGlyphDataFile(Path):
+	# The parsed tables are cached. The cache is used as long as path, modification date and size of the file are the same.
+	try:
+		Stat = os.stat(Path)
+		Key = (Path, Stat.st_mtime, Stat.st_size)
+		CachePath = _glyphDataCachePath(Path)
+		Data = _readGlyphDataCache(CachePath, Key)
+		if Data is None:
+			Data = _parseGlyphData(Path)
+			_writeGlyphDataCache(CachePath, Key, Data)
+	except (IOError, OSError):
+		print "there was a problem reading the GlyphData.xml file. Probably because you did not have a copy of Glyphs in the application folder.(%s)" % Path
+		return
+	Legacy, Categories, SubCategories = Data
+	Nice2Legacy.update(Legacy)
+	_LegacyNames.clear()
+	Name2Category.update(Categories)
+	Name2SubCategory.update(SubCategories)
+
+# .glyphs -> records
+
+def indexLayers(GlyphDict, FontMasters):
+	# returns the master layers in the order of the masters (None if missing) and the brace and bracket layers
+	LayersById = {}
+	if "layers" in GlyphDict:
+		for Layer in GlyphDict["layers"]:
+			if "layerId" in Layer:
+				LayersById[Layer["layerId"]] = Layer
+	MasterLayers = [LayersById.pop(FontMaster["id"], None) for FontMaster in FontMasters]
+	SpecialLayers = []
+	for Layer in LayersById.values():
+		Name = Layer.get("name", "")
+		if "{" in Name or "[" in Name:
+			SpecialLayers.append(Layer)
+	return MasterLayers, SpecialLayers
+
+def fixNodes(Types):
+	# returns the node indexes in drawing order. The last one has to be on-curve as it is used for the move.
+	Count = len(Types)
+	Last = Count - 1
+	while Last >= 0 and Types[Last] == glyphsFormat.OFFCURVE:
+		Last -= 1
+	return [(Last + 1 + i) % Count for i in range(Count)]
+
+def _nodeAt(Nodes, Index):
+	if 0 <= Index < len(Nodes):
+		return Nodes[Index]
+	return None
+
+def _readPaths(Record, Paths, masterIndex, ShiftNodes):
+	Nodes = Record.nodes
+	MasterCount = Record.masterCount
+	nodeIndex = 0
+	for Path in Paths:
+		X, Y, Types, Smooth = decodeNodes(Path["nodes"])
+		Order = fixNodes(Types)
+		if not Order:
+			continue
+		Index = Order[-1]
+		Position = (round(X[Index]) - ShiftNodes, round(Y[Index]))
+		if masterIndex == 0:
+			Nodes.append(NodeRecord(MOVE, [Position], MasterCount))
+		else:
+			Index = nodeIndex
+			if Index > len(Nodes):
+				Index = Index - len(Nodes)
+			node = _nodeAt(Nodes, Index)
+			if node is None:
+				continue # if the master has more paths then the first master
+			node.points[masterIndex][0] = Position
+		firstNodeIndex = nodeIndex
+		nodeIndex = nodeIndex + 1
+		OffcurveNodes = []
+		for NodeIndex in Order:
+			Position = (round(X[NodeIndex]) - ShiftNodes, round(Y[NodeIndex]))
+			NodeType = Types[NodeIndex]
+			if NodeType == glyphsFormat.LINE:
+				if masterIndex == 0:
+					Nodes.append(NodeRecord(LINE, [Position], MasterCount, Smooth[NodeIndex]))
+				else:
+					Index = nodeIndex
+					if Index >= len(Nodes):
+						Index = Index - len(Nodes)
+					node = _nodeAt(Nodes, Index)
+					if node is not None:
+						node.points[masterIndex][0] = Position
+				nodeIndex = nodeIndex + 1
+			elif NodeType == glyphsFormat.CURVE:
+				if len(OffcurveNodes) == 2:
+					if masterIndex == 0:
+						Nodes.append(NodeRecord(CURVE, [Position, OffcurveNodes[0], OffcurveNodes[1]], MasterCount, Smooth[NodeIndex]))
+					else:
+						Index = nodeIndex
+						if Index >= len(Nodes):
+							Index = Index - len(Nodes) + 1
+						node = _nodeAt(Nodes, Index)
+						if node is not None and len(node.points[masterIndex]) == 3:
+							node.points[masterIndex] = [Position, OffcurveNodes[0], OffcurveNodes[1]]
+					nodeIndex = nodeIndex + 1
+				OffcurveNodes = []
+			elif NodeType == glyphsFormat.OFFCURVE:
+				OffcurveNodes.append(Position)
+
+		if "closed" in Path and masterIndex == MasterCount-1:
+			# we may have output a node too much
+			node = _nodeAt(Nodes, nodeIndex-1)
+			firstNode = _nodeAt(Nodes, firstNodeIndex)
+			if node is not None and firstNode is not None:
+				if node.points[0][0] == firstNode.points[0][0]:
+					if node.type == LINE:
+						del Nodes[nodeIndex-1]
+						nodeIndex = nodeIndex - 1
+					elif node.type == CURVE:
+						nextNode = _nodeAt(Nodes, firstNodeIndex+1)
+						if nextNode is not None and nextNode.type != CURVE:
+							# the path now starts at the next node
+							del Nodes[firstNodeIndex]
+							nextNode.type = MOVE
+							nodeIndex = nodeIndex - 1
+			else:
+				print "There was a problem with the outline in the glyph: \"%s\". Probably because the outlines are not compatible." % Record.name
+				Record.mark = 34
+
+def _reference(Text):
+	PathIndex, NodeIndex = Text[1:-1].split(", ")
+	return int(PathIndex), int(NodeIndex)
+
+def _readHints(Record, Hints, masterIndex, ShiftNodes):
+	vHintIndex = 0
+	hHintIndex = 0
+	LinkNodes = None
+	for HintDict in Hints:
+		Horizontal = "horizontal" in HintDict
+		if "target" in HintDict and "origin" in HintDict: # add Links
+			if masterIndex > 0:
+				continue
+			if LinkNodes is None:
+				LinkNodes = nodeReferenceMap([(node.type == MOVE, len(node.points[0])) for node in Record.nodes])
+			Node1 = LinkNodes.get(_reference(HintDict["origin"]))
+			Node2 = None
+			Target = HintDict["target"]
+			if Target[0] == "{":
+				Node2 = LinkNodes.get(_reference(Target))
+			elif Target == "down":
+				Node2 = -2
+			elif Target == "up":
+				Node2 = -1
+			if Node1 is not None and Node2 is not None:
+				if Horizontal:
+					Record.hlinks.append(LinkRecord(Node1, Node2))
+				else:
+					Record.vlinks.append(LinkRecord(Node1, Node2))
+		elif "place" in HintDict:
+			Origin, Size = HintDict["place"][1:-1].split(", ")
+			Origin = int(round(float(Origin)))
+			Size = int(round(float(Size)))
+			if masterIndex == 0:
+				if Horizontal:
+					Record.hhints.append(HintRecord(Origin, Size, Record.masterCount))
+				else:
+					Origin = Origin - ShiftNodes
+					Record.vhints.append(HintRecord(Origin, Size, Record.masterCount))
+			else:
+				if Horizontal:
+					hint = _nodeAt(Record.hhints, hHintIndex)
+					hHintIndex = hHintIndex + 1
+				else:
+					hint = _nodeAt(Record.vhints, vHintIndex)
+					vHintIndex = vHintIndex + 1
+				if hint is not None:
+					hint.positions[masterIndex] = Origin
+					hint.widths[masterIndex] = Size
+
+def _readAnchors(Record, Anchors, masterIndex, ShiftNodes):
+	for AnchorIndex in range(len(Anchors)):
+		AnchorDict = Anchors[AnchorIndex]
+		X, Y = AnchorDict["position"][1:-1].split(", ")
+		Position = (round(float(X)) - ShiftNodes, round(float(Y)))
+		if masterIndex == 0:
+			Record.anchors.append(AnchorRecord(str(AnchorDict["name"]), Position, Record.masterCount))
+		elif AnchorIndex < len(Record.anchors):
+			Record.anchors[AnchorIndex].positions[masterIndex] = Position
+
+def _readComponents(Record, Components, masterIndex):
+	# the transforms are kept as they are in the file, resolveComponents applies the nonspacing mark offsets
+	for componentIndex in range(len(Components)):
+		componentDict = Components[componentIndex]
+		try:
+			componentTransformString = componentDict["transform"][1:-1]
+		except:
+			componentTransformString = u"1, 0, 0, 1, 0, 0"
+		componentTransformList = componentTransformString.split(", ")
+		Transform = (float(componentTransformList[0]), float(componentTransformList[3]), float(componentTransformList[4]), float(componentTransformList[5]))
+		if masterIndex == 0:
+			Record.components.append(ComponentRecord(str(componentDict["name"]), [Transform] * Record.masterCount))
+		else:
+			Record.components[componentIndex].transforms[masterIndex] = Transform
+
+def glyphRecord(GlyphDict, MasterLayers):
+	"""Convert the glyph dict with its master layers (from indexLayers) to a GlyphRecord.
+
+	The components are not resolved, see resolveComponents.
+	"""
+	MasterCount = len(MasterLayers)
+	Record = GlyphRecord(str(GlyphDict["glyphname"]), MasterCount)
+	if "unicode" in GlyphDict:
+		Record.unicode = int(GlyphDict["unicode"], 16)
+	if "export" in GlyphDict and str(GlyphDict["export"]) == "0":
+		Record.exported = False
+		Record.mark = 2
+	if "leftKerningGroup" in GlyphDict:
+		Record.leftKerningGroup = str(GlyphDict["leftKerningGroup"])
+	if "rightKerningGroup" in GlyphDict:
+		Record.rightKerningGroup = str(GlyphDict["rightKerningGroup"])
+	NonSpacingMark = isNonSpacingMark(Record.name)
+
+	if "color" in GlyphDict:
+		try:
+			Color = GlyphDict["color"]
+			if type(Color) == type([]) or Color.__class__.__name__ == "__NSArrayM":
+				r = float(Color[0])
+				g = float(Color[1])
+				b = float(Color[2])
+				h, s, v = colorsys.rgb_to_hsv(r, g, b)
+				Record.mark = int(round(h * 255))
+			else:
+				ColorIndex = int(Color)
+				Mark = Color2Mark[ColorIndex]
+				if Mark == 0:
+					print "The gray mark colors are not supported by FontLab and are ignored."
+				Record.mark = Mark
+		except:
+			pass
+
+	for masterIndex in range(MasterCount):
+		Layer = MasterLayers[masterIndex]
+		if Layer is None:
+			continue
+		if "components" in Layer:
+			try:
+				_readComponents(Record, Layer["components"], masterIndex)
+			except:
+				print "There was a problem reading the components for glyph:", Record.name
+		ShiftNodes = 0
+		if NonSpacingMark:
+			ShiftNodes = round(float(Layer["width"]))
+		else:
+			Record.widths[masterIndex] = round(float(Layer["width"]))
+
+		if "paths" not in Layer:
+			continue
+		_readPaths(Record, Layer["paths"], masterIndex, ShiftNodes)
+		if "hints" in Layer:
+			_readHints(Record, Layer["hints"], masterIndex, ShiftNodes)
+		if "anchors" in Layer:
+			_readAnchors(Record, Layer["anchors"], masterIndex, ShiftNodes)
+	return Record
+
+def resolveComponents(GlyphName, Components, GlyphWidths):
+	"""Round the component offsets and reconstruct the positioning of nonspacing marks.
+
+	They were set to zero width on outline import. GlyphWidths maps the glyph names to the
+	widths of their master layers in the file. Returns the resolved ComponentRecords,
+	components of unknown glyphs are left out.
+	"""
+	NonSpacingMark = isNonSpacingMark(GlyphName)
+	Resolved = []
+	for component in Components:
+		if component.name not in GlyphWidths:
+			print "There was a problem reading the components for glyph:", GlyphName
+			continue
+		isNonSpacingMarkComponent = isNonSpacingMark(component.name)
+		Transforms = []
+		for masterIndex in range(len(component.transforms)):
+			ShiftNodes = 0
+			if isNonSpacingMarkComponent:
+				ShiftNodes = float(GlyphWidths[component.name][masterIndex])
+			# if the glyph itself is a nonspacing mark, move the component
+			if NonSpacingMark:
+				ShiftNodes -= float(GlyphWidths[GlyphName][masterIndex])
+			ScaleX, ScaleY, DeltaX, DeltaY = component.transforms[masterIndex]
+			if masterIndex == 0:
+				DeltaX = round(DeltaX) + ShiftNodes
+			else:
+				DeltaX = round(DeltaX + ShiftNodes)
+			Transforms.append((ScaleX, ScaleY, DeltaX, round(DeltaY)))
+		Resolved.append(ComponentRecord(component.name, Transforms))
+	return Resolved
+
+def componentOrder(Dependencies):
+	# returns the glyph indexes ordered so that each glyph comes after the glyphs it uses as components, and the glyphs that close a component cycle
+	Order = []
+	State = [0] * len(Dependencies) # 0: new, 1: in progress, 2: done
+	Cycles = set()
+	for Root in range(len(Dependencies)):
+		if State[Root] != 0:
+			continue
+		State[Root] = 1
+		Stack = [(Root, iter(Dependencies[Root]))]
+		while Stack:
+			Index, Children = Stack[-1]
+			for Child in Children:
+				if State[Child] == 0:
+					State[Child] = 1
+					Stack.append((Child, iter(Dependencies[Child])))
+					break
+				elif State[Child] == 1:
+					Cycles.add(Child)
+			else:
+				Stack.pop()
+				State[Index] = 2
+				Order.append(Index)
+	return Order, Cycles
+
+def _transform(Transforms, Outer):
+	Result = []
+	for (ScaleX, ScaleY, DeltaX, DeltaY), (OuterScaleX, OuterScaleY, OuterDeltaX, OuterDeltaY) in zip(Transforms, Outer):
+		Result.append((ScaleX * OuterScaleX, ScaleY * OuterScaleY, (DeltaX * OuterScaleX) + OuterDeltaX, (DeltaY * OuterScaleY) + OuterDeltaY))
+	return Result
+
+
+def flattenComponents(GlyphNames, GlyphComponents, NotExported, Statistics=None):
+	"""Decompose nested components and components of glyphs that are not exported. FontLab supports neither.
+
+	GlyphComponents holds the ComponentRecords of each glyph in GlyphNames. The glyphs are
+	processed in component order, so each base glyph is already flat when it is used.
+
+	Returns a dict that maps the index of each changed glyph to (Components, Outlines), where
+	Outlines is a list of (glyph name, transforms): the own outline of that glyph has to be added,
+	transformed. Also returns the names of the glyphs with nested components and of the glyphs
+	in component cycles.
+	"""
+	Indexes = {}
+	for GlyphIndex in range(len(GlyphNames)):
+		Indexes[GlyphNames[GlyphIndex]] = GlyphIndex
+	Order, Cycles = componentOrder([[Indexes[component.name] for component in Components if component.name in Indexes] for Components in GlyphComponents])
+	Flattened = {}
+	Changed = {}
+	GlyphsWithNestedComponents = set()
+	for GlyphIndex in Order:
+		Components = list(GlyphComponents[GlyphIndex])
+		Outlines = []
+		isFlat = True
+		for ComponentIndex in range(len(Components)-1, -1, -1):
+			component = Components[ComponentIndex]
+			BaseIndex = Indexes.get(component.name)
+			if BaseIndex not in Flattened:
+				isFlat = False # part of a component cycle
+				continue
+			BaseComponents, BaseOutlines = Flattened[BaseIndex]
+			if component.name not in NotExported:
+				if len(BaseComponents) == 0:
+					continue
+				GlyphsWithNestedComponents.add(GlyphNames[GlyphIndex])
+			for BaseComponent in BaseComponents:
+				Components.append(ComponentRecord(BaseComponent.name, _transform(BaseComponent.transforms, component.transforms)))
+			del(Components[ComponentIndex])
+			Outlines.append((component.name, component.transforms))
+			for Name, Transforms in BaseOutlines:
+				Outlines.append((Name, _transform(Transforms, component.transforms)))
+			Changed[GlyphIndex] = (Components, Outlines)
+			if Statistics is not None:
+				Statistics.count("components decomposed")
+		if isFlat:
+			Flattened[GlyphIndex] = (Components, Outlines)
+	return Changed, GlyphsWithNestedComponents, set([GlyphNames[Index] for Index in Cycles])
+
+def readGlyphRecords(Dict, GlyphWidths, SpecialLayers):
+	"""Yield a GlyphRecord for each glyph of the document.
+
+	Collects the widths of the master layers (for resolveComponents) and the brace and
+	bracket layers of each glyph on the way.
+	"""
+	FontMasters = Dict["fontMaster"]
+	for GlyphDict in Dict["glyphs"]:
+		yield readGlyphRecord(GlyphDict, FontMasters, GlyphWidths, SpecialLayers)
+
+def readGlyphRecord(GlyphDict, FontMasters, GlyphWidths, SpecialLayers):
+	"""Return the GlyphRecord of one glyph of the document, see readGlyphRecords."""
+	MasterLayers, GlyphSpecialLayers = indexLayers(GlyphDict, FontMasters)
+	Record = glyphRecord(GlyphDict, MasterLayers)
+	if len(GlyphSpecialLayers) > 0:
+		SpecialLayers[Record.name] = GlyphSpecialLayers
+	GlyphWidths[Record.name] = [Layer is not None and Layer.get("width", 0) or 0 for Layer in MasterLayers]
+	return Record
+
+def _canonical(Value):
+	if isinstance(Value, dict):
+		return [(Key, _canonical(Value[Key])) for Key in sorted(Value)]
+	if isinstance(Value, (list, tuple)):
+		return [_canonical(Item) for Item in Value]
+	return Value
+
+def fontHash(Dict):
+	"""Return an MD5 digest of the document without the glyphs, the kerning and the keys of the app (".appVersion")."""
+	Data = [(Key, _canonical(Dict[Key])) for Key in sorted(Dict) if Key != "glyphs" and Key != "kerning" and not Key.startswith(".")]
+	return hashlib.md5(marshal.dumps(Data)).digest()
+
+def kerningHash(GlyphNames, Pairs):
+	"""Return an MD5 digest of the (right glyph index, values) kerning pairs of a glyph, by the names of the right glyphs."""
+	return hashlib.md5(marshal.dumps(sorted([(GlyphNames[RightIndex], Values) for RightIndex, Values in Pairs]))).digest()
+
+def kerningGroups(Glyphs):
+	"""Return the members of the left and right kerning classes, in glyph order.
+
+	The left classes are those of the left glyph of a pair, so they come from the "rightKerningGroup".
+	"""
+	LeftClasses = defaultdict(list)
+	RightClasses = defaultdict(list)
+	for GlyphDict in Glyphs:
+		GlyphName = str(GlyphDict["glyphname"])
+		if "leftKerningGroup" in GlyphDict:
+			RightClasses[str(GlyphDict["leftKerningGroup"])].append(GlyphName)
+		if "rightKerningGroup" in GlyphDict:
+			LeftClasses[str(GlyphDict["rightKerningGroup"])].append(GlyphName)
+	return LeftClasses, RightClasses
+
+def kerningClassString(Key, Side, Members):
+	Key = Key.replace(".", "_").replace("-", "_")
+	Members = legacyNames(Members)
+	Members[0] = Members[0] + "'"
+	return "_%s_%s: %s" % (Key, Side, " ".join(Members))
+
+def kerningClasses(LeftClasses, RightClasses):
+	"""Return the FontLab kerning classes for the kerning groups and the number of left classes.
+
+	LeftClasses and RightClasses map the group names to the member glyph names. The left
+	classes come first.
+	"""
+	Classes = [kerningClassString(Key, "l", LeftClasses[Key]) for Key in sorted(LeftClasses)]
+	LeftCount = len(Classes)
+	Classes.extend([kerningClassString(Key, "r", RightClasses[Key]) for Key in sorted(RightClasses)])
+	return Classes, LeftCount
+
+def kerningPairs(Dict, LeftClasses, RightClasses, GlyphIndexes):
+	"""Yield (left glyph index, right glyph index, values) for each kerning pair of the document.
+
+	A group is kerned through the key glyph of the class, the first member.
+	"""
+	if "kerning" not in Dict:
+		return
+	Kerning = Dict["kerning"]
+	MasterKerning = [Kerning.get(FontMaster["id"], {}) for FontMaster in Dict["fontMaster"]]
+
+	# maps a kerning key to the index of the glyph that holds the kerning
+	KeyIndexes = {}
+	def keyIndex(Key, KeyClasses):
+		if Key not in KeyIndexes:
+			Index = None
+			if Key[0] == "@":
+				#@MMK_L_ or @MMK_R_
+				Members = KeyClasses.get(Key[7:])
+				if Members:
+					Index = GlyphIndexes.get(Members[0])
+			else:
+				Index = GlyphIndexes.get(str(Key))
+			KeyIndexes[Key] = Index
+		return KeyIndexes[Key]
+
+	allLeftKeys = set()
+	for LeftKerning in MasterKerning:
+		allLeftKeys.update(LeftKerning)
+
+	for LeftKey in allLeftKeys:
+		LeftIndex = keyIndex(LeftKey, LeftClasses)
+		if LeftIndex is None:
+			continue
+		RightKerning = [LeftKerning.get(LeftKey, {}) for LeftKerning in MasterKerning]
+		allRightKeys = set()
+		for Values in RightKerning:
+			allRightKeys.update(Values)
+		for RightKey in allRightKeys:
+			RightIndex = keyIndex(RightKey, RightClasses)
+			if RightIndex is None:
+				continue
+			Values = []
+			for MasterValues in RightKerning:
+				value = MasterValues.get(RightKey)
+				if value is not None:
+					Values.append(int(float(value)))
+				else:
+					Values.append(0)
+			yield LeftIndex, RightIndex, Values
+
+def featurePrefixCode(Dict):
+	Code = ""
+	for FeatureDict in Dict.get("featurePrefixes", []):
+		if "name" in FeatureDict and "code" in FeatureDict:
+			Code = Code + "# " + str(FeatureDict["name"]) + "\n" + str(FeatureDict["code"]) + "\n"
+	return Code
+
+def classCodes(Dict, GlyphNames=None):
+	"""Return the OpenType classes as FontLab class strings with legacy glyph names."""
+	Classes = []
+	for FeatureDict in Dict["classes"]:
+		if "name" in FeatureDict and "code" in FeatureDict:
+			Classes.append(str(FeatureDict["name"]) + ": " + _legacyCode(str(FeatureDict["code"]), GlyphNames))
+	return Classes
+
+# splits feature and class code into the words that may be glyph names (even indexes) and the separators between them
+_NameSeparators = re.compile(r"([\s'\[\];]+)")
+_Number = re.compile(r"[-+]?[0-9.]+$")
+
+def _legacyCode(Code, GlyphNames=None):
+	# only the glyph names of the font are converted; without them, every word that is not a number
+	Parts = _NameSeparators.split(Code)
+	if GlyphNames is None:
+		Indexes = [i for i in xrange(0, len(Parts), 2) if _Number.match(Parts[i]) is None]
+	else:
+		Indexes = [i for i in xrange(0, len(Parts), 2) if Parts[i] in GlyphNames]
+	for i, LegacyName in zip(Indexes, legacyNames([Parts[i] for i in Indexes])):
+		Parts[i] = LegacyName
+	return "".join(Parts)
+
+def featureCode(Code, GlyphNames=None):
+	"""Convert the glyph names in the feature code to legacy names. GlyphNames is the set of the glyph names of the font."""
+	return _legacyCode(str(unicode(Code).encode("utf-8")), GlyphNames)
+
+def featureCodes(Dict, GlyphNames=None):
+	"""Yield (name, FontLab feature text) for each feature of the document."""
+	for FeatureDict in Dict["features"]:
+		if "name" in FeatureDict and "code" in FeatureDict:
+			Name = str(FeatureDict["name"])
+			try:
+				CleanCode = featureCode(FeatureDict["code"], GlyphNames).replace("\n", "\n	")
+				yield Name, "feature %s {\n	%s\n} %s;" % (Name, CleanCode, Name)
+			except:
+				print "__ Error in Feature[%s]: %s" % (Name, sys.exc_info()[0])
+
+# records -> .glyphs
+
+def kerningClassKeys(Classes, Flags):
+	"""Read the FontLab kerning classes.
+
+	Classes are the FontLab class strings, Flags the (left, right) flags of each class. Returns a
+	dict that maps each glyph name to its {"l": key glyph, "r": key glyph} and the sets of the
+	key glyphs of the left and right classes.
+	"""
+	ClassesDict = {}
+	FirstClasses = set()
+	SecondClasses = set()
+	for i in range(len(Classes)):
+		if Classes[i][0] == "_":
+			left, right = Flags[i]
+			elements = Classes[i].split(" ")
+			TargetGlyphs = []
+			key = None
+			for j in range(1, len(elements)):
+				if len(elements[j]) > 0:
+					if elements[j][-1] == "'":
+						key = elements[j][:-1]
+						TargetGlyphs.append(key)
+					else:
+						TargetGlyphs.append( elements[j])
+			if key == None:
+				continue
+			if left == 1:
+				FirstClasses.add(key)
+			if right == 1:
+				SecondClasses.add(key)
+
+			for Target in TargetGlyphs:
+				if Target not in ClassesDict:
+					ClassesDict[Target] = {}
+				if left == 1:
+					ClassesDict[Target]['l'] = key
+				if right == 1:
+					ClassesDict[Target]['r'] = key
+	return ClassesDict, FirstClasses, SecondClasses
+
+# the formats of a node in a .glyphs path, by smooth flag
+_LineFormats = ("%d %d LINE", "%d %d LINE SMOOTH")
+_CurveFormats = ("%d %d OFFCURVE\n%d %d OFFCURVE\n%d %d CURVE", "%d %d OFFCURVE\n%d %d OFFCURVE\n%d %d CURVE SMOOTH")
+
+def _pathDict(Formats, Coordinates, isCurve):
+	Nodes = ("\n".join(Formats) % tuple(Coordinates)).split("\n")
+	# a closing curve ends on the start point, that is not written twice
+	if isCurve and int(Coordinates[0]) == int(Coordinates[-2]) and int(Coordinates[1]) == int(Coordinates[-1]):
+		del Nodes[0]
+	return {"nodes": Nodes, "closed": True}
+
+def pathDicts(Nodes, masterIndex):
+	"""Return the paths of a master as they are stored in a .glyphs file."""
+	Paths = []
+	Formats = None
+	for node in Nodes:
+		Points = node.points[masterIndex]
+		if node.type == MOVE or Formats is None:
+			if Formats:
+				Paths.append(_pathDict(Formats, Coordinates, isCurve))
+			Formats = []
+			Coordinates = []
+		isCurve = len(Points) > 1
+		if isCurve:
+			Coordinates += Points[1]
+			Coordinates += Points[2]
+			Coordinates += Points[0]
+			Formats.append(_CurveFormats[node.smooth])
+		else:
+			Coordinates += Points[0]
+			Formats.append(_LineFormats[node.smooth])
+	if Formats:
+		Paths.append(_pathDict(Formats, Coordinates, isCurve))
+	return Paths
+
+def glyphDict(Record, FontMasters):
+	"""Return the dict of the glyph as it is stored in a .glyphs file."""
+	PathIndesPaths = ["{%d, %d}" % Reference for Reference in nodeReferences([(node.type == MOVE, len(node.points[0])) for node in Record.nodes])]
+	Glyph = {}
+	Glyph["glyphname"] = Record.name
+	if Record.rightKerningGroup:
+		Glyph["rightKerningGroup"] = Record.rightKerningGroup
+	if Record.leftKerningGroup:
+		Glyph["leftKerningGroup"] = Record.leftKerningGroup
+	Layers = []
+	for masterIndex in range(Record.masterCount):
+		Layer = {}
+		Layer["associatedMasterId"] = FontMasters[masterIndex]["id"]
+		Layer["layerId"] = FontMasters[masterIndex]["id"]
+		Layer["width"] = Record.widths[masterIndex]
+		if len(Record.components) > 0:
+			Components = []
+			for component in Record.components:
+				Component = {}
+				Component["name"] = component.name
+				Component["transform"] = "{%f, 0, 0, %f, %d, %d}" % component.transforms[masterIndex]
+				Components.append(Component)
+			Layer["components"] = Components;
+		Layer["paths"] = pathDicts(Record.nodes, masterIndex)
+
+		Hints = []
+		for vhint in Record.vhints:
+			Hint = {}
+			Hint["place"] = "{%d, %d}" % (vhint.positions[masterIndex], vhint.widths[masterIndex])
+			Hints.append(Hint)
+		for hhint in Record.hhints:
+			Hint = {}
+			Hint["place"] = "{%d, %d}" % (hhint.positions[masterIndex], hhint.widths[masterIndex])
+			if hhint.widths[masterIndex] == -20:
+				Hint["target"] = "down"
+			if hhint.widths[masterIndex] == -21:
+				Hint["place"] = "{%d, %d}" % (hhint.positions[masterIndex]-21, -hhint.widths[masterIndex])
+				Hint["target"] = "up"
+			Hint["horizontal"] = True
+			Hints.append(Hint)
+		for vlink in Record.vlinks:
+			Hint = {}
+			Hint["origin"] = PathIndesPaths[vlink.node1]
+			Hint["target"] = PathIndesPaths[vlink.node2]
+			Hints.append(Hint)
+		for hlink in Record.hlinks:
+			Hint = {}
+			Hint["origin"] = PathIndesPaths[hlink.node1]
+			if hlink.node2 == -1:
+				Hint["target"] = "up"
+			elif hlink.node2 == -2:
+				Hint["target"] = "down"
+			else:
+				Hint["target"] = PathIndesPaths[hlink.node2]
+			Hint["horizontal"] = True
+			Hints.append(Hint)
+		if len(Hints) > 0:
+			Layer["hints"] = Hints
+
+		Anchors = []
+		for anchor in Record.anchors:
+			Anchor = {}
+			Anchor["position"] = "{%d, %d}" % anchor.positions[masterIndex]
+			Anchor["name"] = anchor.name
+			Anchors.append(Anchor)
+		if len(Anchors)>0:
+			Layer["anchors"] = Anchors
+
+		if Record.background is not None:
+			Paths = pathDicts(Record.background, masterIndex)
+			if len(Paths) > 0:
+				Layer["background"] = {"paths" : Paths}
+		Layers.append(Layer)
+	Glyph["layers"] = Layers
+	if Record.unicode is not None and Record.unicode > 1:
+		Glyph["unicode"] = ("%.4X" % Record.unicode)
+
+	if Record.mark > 0:
+		Mark = Record.mark
+		FoundColorIndex = False
+		for i, j in enumerate(Color2Mark[:10]):
+			if abs(j - Mark) < 5:
+				Glyph["color"] = i
+				FoundColorIndex = True
+				break
+		if not FoundColorIndex:
+			r, g, b = colorsys.hsv_to_rgb(Mark/256., 1., 1.)
+			Glyph["color"] = [int(r * 255), int(g*255), int(b*255), 1]
+	return Glyph
+
+def _nodeData(Nodes):
+	return [(node.type, node.smooth, node.points) for node in Nodes]
+
+def recordHash(Record, MasterIds):
+	"""Return an MD5 digest of everything glyphDict writes of the record for the masters with these ids."""
+	Data = (list(MasterIds), Record.name, Record.masterCount, Record.unicode, Record.mark, Record.widths,
+		Record.leftKerningGroup, Record.rightKerningGroup, _nodeData(Record.nodes),
+		Record.background is not None and _nodeData(Record.background) or None,
+		[(component.name, component.transforms) for component in Record.components],
+		[(hint.positions, hint.widths) for hint in Record.hhints],
+		[(hint.positions, hint.widths) for hint in Record.vhints],
+		[(link.node1, link.node2) for link in Record.hlinks],
+		[(link.node1, link.node2) for link in Record.vlinks],
+		[(anchor.name, anchor.positions) for anchor in Record.anchors])
+	return hashlib.md5(marshal.dumps(Data)).digest()
+
+def classDict(ClassText):
+	"""Return the .glyphs class dict for a FontLab OpenType class, or None for kerning classes."""
+	if ClassText[0] == "_" or ClassText[0] == ".":
+		return None
+	ClassTupel = ClassText.split(":", 1)
+	if len(ClassTupel) != 2:
+		return None
+	Class = {}
+	Class["name"] = ClassTupel[0].strip()
+	Class["code"] = ClassTupel[1].strip()
+	return Class
+
+# comments, strings, the start of a feature block and braces; the rest of the feature code is skipped
+_FeatureToken = re.compile(r'#[^\n]*|"[^"]*"|\bfeature\s+([A-Za-z0-9]{4})\s*{|[{}]')
+_FeatureEnd = re.compile(r'\s*([A-Za-z0-9]{4})\s*;')
+
+_FeatureCache = {}
+
+def _featureBlock(Text):
+	"""Return the code inside the first "feature xxxx { ... } xxxx;" block of Text, or None."""
+	Depth = 0
+	for Match in _FeatureToken.finditer(Text):
+		Token = Match.group()
+		if Depth > 0:
+			if Token == "}":
+				Depth -= 1
+				if Depth == 0:
+					End = _FeatureEnd.match(Text, Match.end())
+					if End is None or End.group(1) != Tag:
+						return None
+					return Text[Start:Match.start()].lstrip()
+			elif Token == "{" or Match.lastindex == 1:
+				Depth += 1
+		elif Match.lastindex == 1:
+			Tag = Match.group(1)
+			Start = Match.end()
+			Depth = 1
+	return None
+
+def featureDict(Tag, Text):
+	"""Return the .glyphs feature dict for a FontLab feature, or None if the code can not be found."""
+	if isinstance(Text, unicode):
+		Key = (Tag, hashlib.md5(Text.encode("utf-8")).digest())
+	else:
+		Key = (Tag, hashlib.md5(Text).digest())
+	if Key in _FeatureCache:
+		return {"name": Tag, "code": _FeatureCache[Key]}
+	Code = None
+	try:
+		Code = _featureBlock(Text.decode('utf8','ignore'))
+	except:
+		print "__ illegal character in feature", Tag
+	if Code is None:
+		StartIndex = Text.find("{")
+		EndIndex = Text.rfind("}")
+		if StartIndex > 0 and EndIndex > 0 and EndIndex > StartIndex:
+			Code = Text[StartIndex+1:EndIndex].strip()
+	if Code is None:
+		print "__ Problme with Features:", Tag, "\n", Text
+		return None
+	if len(_FeatureCache) > 1000:
+		_FeatureCache.clear()
+	_FeatureCache[Key] = Code
+	return {"name": Tag, "code": Code}
@@ -0,0 +1,1135 @@
+# -*- coding: utf-8 -*-
+"""The FontLab side of the Glyphs import and export."""
+#
+# Copies the records of glyphsConvert into FontLab glyphs and back. Outside of
+# FontLab, the in-memory stand-in memoryFL is used, so the whole conversion runs
+# headless:
+#
+#	Font = Font()
+#	importGlyphsDocument(Font, readGlyphsDocument(Path))
+
+import time
+import sys
+import hashlib
+from collections import defaultdict
+
+try:
+	from FL import *
+except ImportError:
+	from memoryFL import *
+
+import glyphsConvert
+from glyphsConvert import MOVE, LINE, CURVE, NodeRecord, ComponentRecord, HintRecord, LinkRecord, AnchorRecord, GlyphRecord, \
+	NotNiceName, readGlyphRecords, readGlyphRecord, resolveComponents, flattenComponents, kerningGroups, kerningClasses, kerningPairs, \
+	featurePrefixCode, classCodes, featureCodes, kerningClassKeys, glyphDict, classDict, featureDict, recordHash, \
+	fontHash, kerningHash, legacyNames
+from glyphsStats import Stats
+
+__all__ = ["setFontInfo", "readGlyphs", "readKerning", "readFeatures", "setLegacyNames", "importGlyphsDocument",
+	"updateGlyphs", "updateKerning", "updateGlyphsDocument", "glyphFromRecord", "recordFromGlyph", "makePlist", "writeFeatures"]
+
+_FLNodeTypes = {MOVE: nMOVE, LINE: nLINE, CURVE: nCURVE}
+
+shortStyleList = {"Extra": "Ex", "Condensed": "Cond", "Extended": "Extd", "Semi":"Sm", "Italic": "It", "Bold":"Bd", " Sans":"", " Mono":""}
+
+def setInstanceStyleNames(Font, Dict):
+	_Familie = str(Dict['familyName'])
+	try:
+		_Instance = Dict['instances'][0]
+	except:
+		_Instance = {"name":"Regular"}
+	_Schnitt = str(_Instance['name'])
+
+	if "linkStyle" in _Instance:
+		_FamSchnitt = str(_Instance["linkStyle"]) # für Style linking
+	else:
+		_FamSchnitt = _Schnitt
+
+	try:
+		_isBold = bool(_Instance["isBold"])
+	except:
+		_isBold = False
+	try:
+		_isItalic = bool(_Instance["isItalic"])
+	except:
+		_isItalic = False
+
+	_Weight = "Regular"
+	_Width = "Medium (normal)"
+	_Weightcode = 400
+	#_Widthcode =
+	if "weightClass" in _Instance:
+		_Weight = str(_Instance["weightClass"])
+	if "widthClass" in _Instance:
+		_Width = str(_Instance["widthClass"])
+	if _Weight in glyphsConvert.weightCodes:
+		_Weightcode = int(glyphsConvert.weightCodes[_Weight])
+
+	if "customParameters" in _Instance:
+		_CustomParameters = _Instance["customParameters"]
+		for Parameter in _CustomParameters:
+			if Parameter["name"] == "openTypeOS2WeightClass":
+				_Weightcode = int(Parameter["value"])
+			if Parameter["name"] == "openTypeOS2WidthClass":
+				_Widthcode = int(Parameter["value"])
+	Font.weight = _Weight
+	Font.weight_code = _Weightcode
+	Font.width = _Width
+	#Font.width_code = _Widthcode
+
+	_Flag = 0
+	if _isBold:
+		_Flag = 32
+	if _isItalic:
+		_Flag = _Flag + 1
+
+	Font.font_style = _Flag
+
+	if _Flag == 1:
+		_WinStyle = "Italic"
+	elif _Flag == 32:
+		_WinStyle = "Bold"
+	elif _Flag == 33:
+		_WinStyle = "Bold Italic"
+	else:
+		_WinStyle = "Regular"
+
+	_WinFamily = _Schnitt.replace(_WinStyle, "")
+	if len(_WinFamily) > 0 :
+		_WinFamily = " " + _WinFamily
+		if _WinFamily[-1] == " ":
+			_WinFamily = _WinFamily[0:-1]
+	_shortStyle = _Schnitt
+	for any in shortStyleList:
+		if len(_Familie + " " + _shortStyle) <= 28:
+			break
+		_shortStyle = _shortStyle.replace(any, shortStyleList[any])
+	_postscriptName = _Familie + "-" + _shortStyle
+	_postscriptName = _postscriptName.replace(" ", "")
+	print _postscriptName
+	Font.family_name = _Familie
+	Font.style_name = _WinStyle
+
+	Font.full_name = _Familie + " " + _Schnitt
+	Font.font_name = _postscriptName
+	Font.menu_name = _Familie + " " + _Schnitt
+	Font.apple_name = _postscriptName
+	Font.pref_style_name = _Schnitt
+	Font.pref_family_name = _Familie
+
+	Font.mac_compatible = ""
+	Font.menu_name = ""
+
+	Font.fontnames.clean()
+	try:
+		Font.fontnames.append(NameRecord( 0,1,0,0,		Font.copyright))
+		Font.fontnames.append(NameRecord( 0,3,1,1033,	Font.copyright))
+	except:
+		print "Copyright-Angabe fehlt"
+
+	Font.fontnames.append(NameRecord( 1,1,0,0,		_Familie))
+	Font.fontnames.append(NameRecord( 1,3,1,1033,	_Familie + _WinFamily))
+	Font.fontnames.append(NameRecord( 2,1,0,0,		_Schnitt))
+	Font.fontnames.append(NameRecord( 2,3,1,1033,	_WinStyle))
+	Font.fontnames.append(NameRecord( 3,1,0,0,		"%s: %s %s, %d" % (Font.designer, _Familie, _Schnitt, Font.year)))
+	Font.fontnames.append(NameRecord( 3,3,1,1033,	"%s: %s %s, %d" % (Font.designer, _Familie, _Schnitt, Font.year)))
+	if _Schnitt == "Regular":
+		Font.fontnames.append(NameRecord( 4,1,0,0,	_Familie))
+	else:
+		Font.fontnames.append(NameRecord( 4,1,0,0,	_Familie + " " + _Schnitt))
+	Font.fontnames.append(NameRecord( 4,3,1,1033,	_Familie + " " + _Schnitt))
+	try:
+		Font.fontnames.append(NameRecord( 5,1,0,0,		Font.version))
+		Font.fontnames.append(NameRecord( 5,3,1,1033,	Font.version))
+	except:
+		print "Version-Angabe fehlt"
+	Font.fontnames.append(NameRecord( 6,1,0,0,		_postscriptName))
+	Font.fontnames.append(NameRecord( 6,3,1,1033,	_postscriptName))
+	try:
+		Font.fontnames.append(NameRecord( 7,1,0,0,		Font.trademark))
+		Font.fontnames.append(NameRecord( 7,3,1,1033,	Font.trademark))
+	except:
+		print "Trademark-Angabe fehlt"
+	try:
+		Font.fontnames.append(NameRecord( 9,1,0,0,		Font.designer))
+		Font.fontnames.append(NameRecord( 9,3,1,1033,	Font.designer))
+	except:
+		print "Trademark-Angabe fehlt"
+	try:
+		Font.fontnames.append(NameRecord( 11,1,0,0,	Font.vendor_url))
+		Font.fontnames.append(NameRecord( 11,3,1,1033,	Font.vendor_url))
+	except:
+		print "Vendor-URL-Angabe fehlt"
+	try:
+		Font.fontnames.append(NameRecord( 12,1,0,0,	Font.designer_url))
+		Font.fontnames.append(NameRecord( 12,3,1,1033,	Font.designer_url))
+	except:
+		print "Trademark-Angabe fehlt"
+	Font.fontnames.append(NameRecord( 16,3,1,1033,	_Familie))
+	Font.fontnames.append(NameRecord( 17,3,1,1033,	_Schnitt))
+	if len(_Familie + " " + _Schnitt) >= 28:
+		Font.fontnames.append(NameRecord( 18,1,0,0, _Familie + " " + _shortStyle))
+
+
+def setFontInfo(Font, Dict):
+	KeyTranslate = {
+		"familyName" : ("family_name", str),
+		"versionMajor" : ("version_major", int),
+		"versionMinor": ("version_minor", int),
+		"unitsPerEm" : ("upm", int),
+		"copyright" : ("copyright", unicode),
+		"designer" : ("designer", unicode),
+		"designerURL" : ("designer_url", unicode),
+		"manufacturer" : ("vendor", unicode),
+		"manufacturerURL" : ("vendor_url", unicode),
+	}
+	for Key in KeyTranslate:
+		if Key in Dict:
+			FlKey, FlType = KeyTranslate[Key]
+			if FlType == unicode:
+				setattr(Font, FlKey, unicode(Dict[Key]).encode("utf-8"))
+			elif FlType == str:
+				setattr(Font, FlKey, str(Dict[Key]))
+			elif FlType == int:
+				setattr(Font, FlKey, int(Dict[Key]))
+	if "date" in Dict:
+		try:
+			import datetime
+			Date = datetime.datetime.strptime(Dict["date"][:-6], "%Y-%m-%d %H:%M:%S") #2004-03-02 15:27:47 +0100
+			Font.year = int(Date.year)
+		except:
+			Font.year = int(Dict["date"][:4])
+	if "versionMajor" in Dict and "versionMinor" in Dict:
+		Font.version = "%d.%03d" % (Font.version_major, Font.version_minor)
+	FontMasters = Dict["fontMaster"]
+
+	if len(FontMasters) == 1:
+		setInstanceStyleNames(Font, Dict)
+	else:
+		Font.weight = "All"
+	MasterCount = len(FontMasters)
+
+	for FontMaster in FontMasters:
+		if "weight" not in FontMaster.keys():
+			FontMaster["weight"] = "Regular"
+
+	if MasterCount == 1:
+		pass
+	elif MasterCount == 2:
+		if FontMasters[0]["weight"] != FontMasters[1]["weight"]:
+			Font.DefineAxis("Weight", "Weight", "Wt")
+		else:
+			Font.DefineAxis("Width", "Width", "Wd")
+	elif MasterCount == 4:
+		if FontMasters[0]["weight"] != FontMasters[1]["weight"]:
+			Font.DefineAxis("Weight", "Weight", "Wt")
+			Font.DefineAxis("Width", "Width", "Wd")
+		else:
+			Font.DefineAxis("Width", "Width", "Wd")
+			Font.DefineAxis("Weight", "Weight", "Wt")
+		print "Please check the arrangement of the axis and masters. The association of the Glyphs masters might not fit."
+	else:
+		print "Fonts with a master count of %d are not supported" % MasterCount
+		return False
+
+	KeyTranslate = {
+		"postscriptIsFixedPitch" : ("is_fixed_pitch", bool),
+		"postscriptUnderlinePosition" : ("underline_position", int),
+		"postscriptUnderlineThickness" : ("underline_thickness", int),
+		#"openTypeOS2StrikeoutSize" : ("ttinfo.os2_y_strikeout_size", int),
+		#"openTypeOS2StrikeoutPosition" : ("ttinfo.os2_y_strikeout_position", int),
+		"openTypeNameLicense" : ("license", unicode),
+		"openTypeNameLicenseURL" : ("license_url", unicode),
+		"openTypeOS2Type" : ("ttinfo.os2_fs_type", "fsType")
+	}
+	if "customParameters" in Dict:
+		for Parameter in Dict["customParameters"]:
+			Name = Parameter["name"]
+			Value = Parameter["value"]
+			try:
+				FlKey, FlType = KeyTranslate[Name]
+				if Name in KeyTranslate:
+					if FlType == str:
+						setattr(Font, FlKey, str(Value))
+					elif FlType == int:
+						setattr(Font, FlKey, int(Value))
+					elif FlType == unicode:
+						setattr(Font, FlKey, unicode(Value).encode("utf-8"))
+					elif FlType == bool:
+						setattr(Font, FlKey, bool(Value))
+					elif FlType == "fsType":
+						fs_type = 0
+						for Bit in Value:
+							fs_type = fs_type + 2**int(Bit)
+						Font.ttinfo.os2_fs_type = int(fs_type)
+			except:
+				pass
+	for i in range(MasterCount):
+			Font.ascender[i] = int(FontMasters[i]["ascender"])
+			Font.descender[i] = int(FontMasters[i]["descender"])
+			Font.cap_height[i] = int(FontMasters[i]["capHeight"])
+			Font.x_height[i] = int(FontMasters[i]["xHeight"])
+			if "italicAngle" in FontMasters[i]:
+				Font.italic_angle = float(FontMasters[i]["italicAngle"])
+
+			if "horizontalStems" in FontMasters[i]:
+				if i == 0:
+					Font.stem_snap_h_num = len(FontMasters[i]["horizontalStems"])
+				for j in range(len(FontMasters[i]["horizontalStems"])):
+					Font.stem_snap_h[i][j] = int(FontMasters[i]["horizontalStems"][j])
+
+			if "verticalStems" in FontMasters[i]:
+				if i == 0:
+					Font.stem_snap_v_num = len(FontMasters[i]["verticalStems"])
+				for j in range(len(FontMasters[i]["verticalStems"])):
+					Font.stem_snap_v[i][j] = int(FontMasters[i]["verticalStems"][j])
+
+			if "alignmentZones" in FontMasters[i]:
+				BlueZones = []
+				OtherZones = []
+				for ZoneString in FontMasters[i]["alignmentZones"]:
+					Zone = str(ZoneString)[1:-1].split(", ")
+					Zone = map(int, Zone)
+
+					if Zone[1] < 0 and Zone[0] != 0:
+						OtherZones.append(Zone[0])
+						OtherZones.append(Zone[0] + Zone[1])
+					else:
+						BlueZones.append(Zone[0])
+						BlueZones.append(Zone[0] + Zone[1])
+				if len(BlueZones) >= 14:
+					BlueZones = BlueZones[:13]
+					print "Warning: There are to many Blue Zones."
+				if i == 0:
+					Font.blue_values_num = len(BlueZones)
+					Font.other_blues_num = len(OtherZones)
+
+				for j in range(Font.blue_values_num):
+					Font.blue_values[i][j] = BlueZones[j]
+				for j in range(Font.other_blues_num):
+					Font.other_blues[i][j] = OtherZones[j]
+	return True
+
+def _setPoints(Layer, Points):
+	for pointIndex in range(len(Points)):
+		Layer[pointIndex].x, Layer[pointIndex].y = Points[pointIndex]
+
+def glyphFromRecord(Record):
+	"""Return a new FontLab glyph with the outline, hints, links and anchors of the record. The components are added by readGlyphs."""
+	MasterCount = Record.masterCount
+	glyph = Glyph(MasterCount)
+	glyph.name = Record.name
+	if Record.unicode is not None:
+		glyph.unicode = Record.unicode
+	if not Record.exported:
+		glyph.customdata = "Not Exported"
+	if Record.mark > 0:
+		glyph.mark = Record.mark
+	for masterIndex in range(MasterCount):
+		glyph.SetMetrics(Point(Record.widths[masterIndex], 0), masterIndex)
+
+	for nodeRecord in Record.nodes:
+		Points = nodeRecord.points[0]
+		node = Node(_FLNodeTypes[nodeRecord.type], Point(Points[0][0], Points[0][1]))
+		if nodeRecord.smooth:
+			node.alignment = nSMOOTH
+		if nodeRecord.type == CURVE:
+			_setPoints(node.points, Points)
+		glyph.Insert(node, len(glyph))
+	if MasterCount > 1 and len(Record.nodes) > 0:
+		Nodes = glyph.nodes
+		for nodeIndex in range(len(Record.nodes)):
+			MasterPoints = Record.nodes[nodeIndex].points
+			node = Nodes[nodeIndex]
+			for masterIndex in range(1, MasterCount):
+				_setPoints(node.Layer(masterIndex), MasterPoints[masterIndex])
+
+	for Records, Hints in ((Record.hhints, glyph.hhints), (Record.vhints, glyph.vhints)):
+		for hintRecord in Records:
+			Hints.append(Hint(hintRecord.positions[0], hintRecord.widths[0]))
+			if MasterCount > 1:
+				hint = Hints[len(Hints)-1]
+				for masterIndex in range(1, MasterCount):
+					hint.positions[masterIndex] = hintRecord.positions[masterIndex]
+					hint.widths[masterIndex] = hintRecord.widths[masterIndex]
+	for linkRecord in Record.hlinks:
+		glyph.hlinks.append(Link(linkRecord.node1, linkRecord.node2))
+	for linkRecord in Record.vlinks:
+		glyph.vlinks.append(Link(linkRecord.node1, linkRecord.node2))
+
+	for anchorRecord in Record.anchors:
+		X, Y = anchorRecord.positions[0]
+		glyph.anchors.append(Anchor(anchorRecord.name, X, Y))
+		if MasterCount > 1:
+			anchor = glyph.anchors[len(glyph.anchors)-1]
+			for masterIndex in range(1, MasterCount):
+				Position = anchor.Layer(masterIndex)
+				Position.x, Position.y = anchorRecord.positions[masterIndex]
+	return glyph
+
+def _addComponent(glyph, component, GlyphIndexes):
+	ScaleX, ScaleY, DeltaX, DeltaY = component.transforms[0]
+	glyph.components.append(Component(GlyphIndexes[component.name], Point(DeltaX, DeltaY), Point(ScaleX, ScaleY)))
+	if len(component.transforms) > 1:
+		FlComponent = glyph.components[len(glyph.components)-1]
+		for masterIndex in range(1, len(component.transforms)):
+			ScaleX, ScaleY, DeltaX, DeltaY = component.transforms[masterIndex]
+			FlComponent.scales[masterIndex].x = ScaleX
+			FlComponent.scales[masterIndex].y = ScaleY
+			FlComponent.deltas[masterIndex].x = DeltaX
+			FlComponent.deltas[masterIndex].y = DeltaY
+
+def _outlineData(glyph, NodeCount, MasterCount):
+	Outline = []
+	Nodes = glyph.nodes
+	for nodeIndex in range(NodeCount):
+		node = Nodes[nodeIndex]
+		Points = []
+		for masterIndex in range(MasterCount):
+			Layer = node.Layer(masterIndex)
+			Points.append([(Layer[pointIndex].x, Layer[pointIndex].y) for pointIndex in range(node.count)])
+		Outline.append((node, Points))
+	return Outline
+
+def _addOutline(glyph, Outline, Transforms):
+	for BaseNode, Points in Outline:
+		node = Node(BaseNode)
+		for masterIndex in range(len(Transforms)):
+			ScaleX, ScaleY, DeltaX, DeltaY = Transforms[masterIndex]
+			Layer = node.Layer(masterIndex)
+			pointIndex = 0
+			for X, Y in Points[masterIndex]:
+				Layer[pointIndex].x = (X * ScaleX) + DeltaX
+				Layer[pointIndex].y = (Y * ScaleY) + DeltaY
+				pointIndex += 1
+		glyph.Insert(node, len(glyph))
+
+# the per glyph lists of the import state, in the order of the glyphs in the font
+_GlyphStateKeys = ("names", "hashes", "componentNames", "components", "widths", "exported", "nodeCounts", "leftGroups", "rightGroups")
+
+def _setGlyphState(State, Index, Record, Hash, Widths):
+	for Key, Value in (("names", Record.name), ("hashes", Hash), ("componentNames", [component.name for component in Record.components]),
+			("components", []), ("widths", Widths), ("exported", Record.exported), ("nodeCounts", len(Record.nodes)),
+			("leftGroups", Record.leftKerningGroup), ("rightGroups", Record.rightKerningGroup)):
+		if Index < len(State[Key]):
+			State[Key][Index] = Value
+		else:
+			State[Key].append(Value)
+
+def _placeComponents(Font, GlyphNames, GlyphComponents, NodeCounts, NotExported, MasterCount, Statistics=None, Dirty=None):
+	# adds the resolved components, and the outlines of the decomposed ones, to the glyphs (only to the glyphs with the indexes in Dirty if given)
+	GlyphIndexes = {}
+	for GlyphIndex in range(len(GlyphNames)):
+		GlyphIndexes[GlyphNames[GlyphIndex]] = GlyphIndex
+	Changed, GlyphsWithNestedComponents, GlyphsInCycles = flattenComponents(GlyphNames, GlyphComponents, NotExported, Statistics)
+	if Dirty is None:
+		Dirty = range(len(GlyphNames))
+	else:
+		Dirty = sorted(Dirty)
+		DirtyNames = set([GlyphNames[GlyphIndex] for GlyphIndex in Dirty])
+		GlyphsWithNestedComponents &= DirtyNames
+		GlyphsInCycles &= DirtyNames
+	Outlines = {}
+	for GlyphIndex in Dirty:
+		Components = GlyphComponents[GlyphIndex]
+		Decomposed = []
+		if GlyphIndex in Changed:
+			Components, Decomposed = Changed[GlyphIndex]
+		if len(Components) == 0 and len(Decomposed) == 0:
+			continue
+		glyph = Font.glyphs[GlyphIndex]
+		for component in Components:
+			_addComponent(glyph, component, GlyphIndexes)
+		for Name, Transforms in Decomposed:
+			BaseIndex = GlyphIndexes[Name]
+			if BaseIndex not in Outlines:
+				# only the own outline, without the outlines that were added to the base glyph
+				Outlines[BaseIndex] = _outlineData(Font.glyphs[BaseIndex], NodeCounts[BaseIndex], MasterCount)
+			_addOutline(glyph, Outlines[BaseIndex], Transforms)
+	if len(GlyphsWithNestedComponents) > 0:
+		print "The font has nested components. They are not supported in FontLab and were decomposed.\n(%s)" % ", ".join(sorted(GlyphsWithNestedComponents))
+	if len(GlyphsInCycles) > 0:
+		print "The font has components that refer to themselves. They were not decomposed.\n(%s)" % ", ".join(sorted(GlyphsInCycles))
+
+def readGlyphs(Font, Dict, Statistics=None, State=None):
+	"""Add the glyphs of the document to the empty Font. Returns the brace and bracket layers that were left out.
+
+	If State is a dict, the state of the glyphs is stored in it for updateGlyphsDocument.
+	"""
+	if Statistics is None:
+		Statistics = Stats("readGlyphs")
+	MasterCount = len(Dict["fontMaster"])
+	GlyphNames = []
+	GlyphWidths = {}
+	GlyphComponents = []
+	NodeCounts = []
+	NotExported = set()
+	SpecialLayers = {}
+	if State is not None:
+		Glyphs = Dict["glyphs"]
+		for Key in _GlyphStateKeys:
+			State[Key] = []
+	for Record in readGlyphRecords(Dict, GlyphWidths, SpecialLayers):
+		glyph = glyphFromRecord(Record)
+		Font.glyphs.append(glyph)
+		if State is not None:
+			_setGlyphState(State, len(GlyphNames), Record, hashlib.md5(Glyphs.text(len(GlyphNames))).digest(), GlyphWidths[Record.name])
+		GlyphNames.append(Record.name)
+		GlyphComponents.append(Record.components)
+		NodeCounts.append(len(Record.nodes))
+		if not Record.exported:
+			NotExported.add(Record.name)
+		Statistics.count("glyphs")
+		Statistics.count("nodes", len(Record.nodes))
+
+	# the legacy names are looked up again for the kerning classes, the features and setLegacyNames
+	legacyNames(GlyphNames)
+
+	# Read the components.
+	for GlyphIndex in range(len(GlyphNames)):
+		if len(GlyphComponents[GlyphIndex]) > 0:
+			GlyphComponents[GlyphIndex] = resolveComponents(GlyphNames[GlyphIndex], GlyphComponents[GlyphIndex], GlyphWidths)
+			if State is not None:
+				State["components"][GlyphIndex] = [(component.name, component.transforms) for component in GlyphComponents[GlyphIndex]]
+
+	# Resolve nested components.
+	_placeComponents(Font, GlyphNames, GlyphComponents, NodeCounts, NotExported, MasterCount, Statistics)
+	fl.UpdateFont()
+	return SpecialLayers
+
+def updateGlyphs(Font, Dict, State, Statistics=None):
+	"""Apply the glyphs of the document that changed since the import described by State to Font.
+
+	A glyph counts as changed if its text in the file changed. The changed, added and removed
+	glyphs and the glyphs that use them as components are read again, all others are left
+	alone. State is updated. Returns the brace and bracket layers that were left out and the
+	indexes of the glyphs that were read again.
+	"""
+	if Statistics is None:
+		Statistics = Stats("updateGlyphs")
+	FontMasters = Dict["fontMaster"]
+	MasterCount = len(FontMasters)
+	Glyphs = Dict["glyphs"]
+	Names = State["names"]
+	OldIndexes = {}
+	for Index in range(len(Names)):
+		OldIndexes[State["hashes"][Index]] = Index
+	Unchanged = {} # maps the old index to the index in the document
+	Parsed = []
+	GlyphWidths = {}
+	SpecialLayers = {}
+	for DocIndex in range(len(Glyphs)):
+		Hash = hashlib.md5(Glyphs.text(DocIndex)).digest()
+		Index = OldIndexes.get(Hash)
+		if Index is not None and Index not in Unchanged:
+			Unchanged[Index] = DocIndex
+		else:
+			Parsed.append((DocIndex, readGlyphRecord(Glyphs[DocIndex], FontMasters, GlyphWidths, SpecialLayers), Hash))
+
+	# glyphs that use a changed glyph as component are read again, too
+	ParsedNames = set([Record.name for DocIndex, Record, Hash in Parsed])
+	Users = defaultdict(list)
+	for Index in Unchanged:
+		for Name in State["componentNames"][Index]:
+			Users[Name].append(Index)
+	Stack = list(ParsedNames) + [Names[Index] for Index in range(len(Names)) if Index not in Unchanged]
+	while Stack:
+		for Index in Users.get(Stack.pop(), ()):
+			if Index in Unchanged:
+				DocIndex = Unchanged.pop(Index)
+				Record = readGlyphRecord(Glyphs[DocIndex], FontMasters, GlyphWidths, SpecialLayers)
+				Parsed.append((DocIndex, Record, State["hashes"][Index]))
+				ParsedNames.add(Record.name)
+				Stack.append(Record.name)
+
+	for Index in range(len(Names)-1, -1, -1):
+		if Index not in Unchanged and Names[Index] not in ParsedNames:
+			del Font.glyphs[Index]
+			for Key in _GlyphStateKeys:
+				del State[Key][Index]
+			Statistics.count("glyphs removed")
+	GlyphIndexes = {}
+	for Index in range(len(Names)):
+		GlyphIndexes[Names[Index]] = Index
+	Dirty = set()
+	Parsed.sort()
+	for DocIndex, Record, Hash in Parsed:
+		glyph = glyphFromRecord(Record)
+		Index = GlyphIndexes.get(Record.name)
+		if Index is None:
+			Index = len(Names)
+			GlyphIndexes[Record.name] = Index
+			Font.glyphs.append(glyph)
+			Statistics.count("glyphs added")
+		else:
+			Font.glyphs[Index].Assign(glyph)
+			Statistics.count("glyphs updated")
+		_setGlyphState(State, Index, Record, Hash, GlyphWidths[Record.name])
+		State["components"][Index] = Record.components
+		Dirty.add(Index)
+		Statistics.count("nodes", len(Record.nodes))
+
+	GlyphWidths = dict(zip(Names, State["widths"]))
+	for Index in Dirty:
+		if len(State["components"][Index]) > 0:
+			State["components"][Index] = [(component.name, component.transforms) for component in resolveComponents(Names[Index], State["components"][Index], GlyphWidths)]
+	GlyphComponents = [[ComponentRecord(Name, Transforms) for Name, Transforms in Components] for Components in State["components"]]
+	NotExported = set([Names[Index] for Index in range(len(Names)) if not State["exported"][Index]])
+	_placeComponents(Font, Names, GlyphComponents, State["nodeCounts"], NotExported, MasterCount, None, Dirty)
+	for Index in Dirty:
+		glyph = Font.glyphs[Index]
+		NewName = NotNiceName(glyph.name)
+		if NewName != glyph.name:
+			glyph.name = NewName
+	fl.UpdateFont()
+	return SpecialLayers, Dirty
+
+def _kerningGroups(State):
+	# the kerning groups of the glyphs in the import state, like kerningGroups
+	LeftClasses = defaultdict(list)
+	RightClasses = defaultdict(list)
+	for Name, LeftGroup, RightGroup in zip(State["names"], State["leftGroups"], State["rightGroups"]):
+		if LeftGroup is not None:
+			RightClasses[LeftGroup].append(Name)
+		if RightGroup is not None:
+			LeftClasses[RightGroup].append(Name)
+	return LeftClasses, RightClasses
+
+def _setKerningClasses(Font, Classes, LeftCount, OtherClasses=()):
+	OtherClasses = list(OtherClasses)
+	Font.classes = Classes + OtherClasses
+	for i in range(LeftCount):
+		Font.SetClassFlags(i, True, False)
+	for i in range(LeftCount, len(Classes)):
+		Font.SetClassFlags(i, False, True)
+	for i in range(len(Classes), len(Classes) + len(OtherClasses)):
+		Font.SetClassFlags(i, False, False)
+
+def _kerningPairs(Dict, LeftClasses, RightClasses, GlyphIndexes):
+	# the kerning pairs of the document as a dict that maps the left glyph index to a list of (right glyph index, values)
+	Pairs = defaultdict(list)
+	for LeftIndex, RightIndex, Values in kerningPairs(Dict, LeftClasses, RightClasses, GlyphIndexes):
+		Pairs[LeftIndex].append((RightIndex, Values))
+	return Pairs
+
+def _addKerning(glyph, Pairs):
+	for RightIndex, Values in Pairs:
+		KernPair = KerningPair(RightIndex)
+		for j in range(len(Values)):
+			KernPair.values[j] = Values[j]
+		glyph.kerning.append(KernPair)
+
+def readKerning(Font, Dict, Statistics=None, State=None):
+	"""Add the kerning classes and pairs of the document to Font.
+
+	With the State of readGlyphs, the kerning groups are taken from it instead of reading
+	the glyphs again, and the state of the kerning is added to it.
+	"""
+	if Statistics is None:
+		Statistics = Stats("readKerning")
+	if State is not None:
+		LeftClasses, RightClasses = _kerningGroups(State)
+	else:
+		LeftClasses, RightClasses = kerningGroups(Dict["glyphs"])
+	Classes, LeftCount = kerningClasses(LeftClasses, RightClasses)
+	_setKerningClasses(Font, Classes, LeftCount)
+	Statistics.count("kerning classes", len(Classes))
+
+	Glyphs = Font.glyphs
+	GlyphNames = [Glyphs[i].name for i in range(len(Glyphs))]
+	GlyphIndexes = {}
+	for i in range(len(GlyphNames)):
+		GlyphIndexes[GlyphNames[i]] = i
+	Pairs = _kerningPairs(Dict, LeftClasses, RightClasses, GlyphIndexes)
+	for LeftIndex, GlyphPairs in Pairs.items():
+		_addKerning(Glyphs[LeftIndex], GlyphPairs)
+		Statistics.count("kerning pairs", len(GlyphPairs))
+	if State is not None:
+		State["classes"] = Classes
+		State["kerning"] = dict([(GlyphNames[LeftIndex], kerningHash(GlyphNames, GlyphPairs)) for LeftIndex, GlyphPairs in Pairs.items()])
+
+def updateKerning(Font, Dict, State, Dirty, Statistics=None):
+	"""Apply the kerning of the document to Font, after updateGlyphs.
+
+	The kerning classes are only set if they changed, the pairs only for the glyphs in Dirty
+	and the glyphs whose pairs changed.
+	"""
+	if Statistics is None:
+		Statistics = Stats("updateKerning")
+	LeftClasses, RightClasses = _kerningGroups(State)
+	Classes, LeftCount = kerningClasses(LeftClasses, RightClasses)
+	if Classes != State["classes"]:
+		# the OpenType classes follow the kerning classes
+		_setKerningClasses(Font, Classes, LeftCount, Font.classes[len(State["classes"]):])
+		State["classes"] = Classes
+		Statistics.count("kerning classes updated")
+
+	Names = State["names"]
+	GlyphIndexes = {}
+	for Index in range(len(Names)):
+		GlyphIndexes[Names[Index]] = Index
+	Pairs = _kerningPairs(Dict, LeftClasses, RightClasses, GlyphIndexes)
+	Hashes = dict([(Names[LeftIndex], kerningHash(Names, GlyphPairs)) for LeftIndex, GlyphPairs in Pairs.items()])
+	OldHashes = State["kerning"]
+	for Name in set(Hashes) | set(OldHashes):
+		Index = GlyphIndexes.get(Name)
+		if Index is None or (Index not in Dirty and Hashes.get(Name) == OldHashes.get(Name)):
+			continue
+		glyph = Font.glyphs[Index]
+		glyph.kerning.clean()
+		_addKerning(glyph, Pairs.get(Index, ()))
+		Statistics.count("kerning glyphs updated")
+	State["kerning"] = Hashes
+
+def readFeatures(Font, Dict, GlyphNames=None):
+	"""Read the prefixes, classes and features. GlyphNames are the names of the glyphs before setLegacyNames."""
+	Font.ot_classes = ""
+	try:
+		Font.ot_classes = featurePrefixCode(Dict)
+	except:
+		pass
+	try:
+		Classes = Font.classes
+		if "classes" in Dict:
+			Classes.extend(classCodes(Dict, GlyphNames))
+			Font.classes = Classes
+		else:
+			print "the font has no Classes."
+	except:
+		print "__ Error in Classes:", sys.exc_info()[0]
+	try:
+		if "features" in Dict:
+			for Name, Code in featureCodes(Dict, GlyphNames):
+				Font.features.append(Feature(Name, Code))
+		else:
+			print "The font has no Feature."
+	except:
+		print "__ Error in Feature:", sys.exc_info()[0]
+
+def setLegacyNames(Font):
+	Glyphs = Font.glyphs
+	Names = [glyph.name for glyph in Glyphs]
+	for glyph, Name, NewName in zip(Glyphs, Names, legacyNames(Names)):
+		if NewName != Name:
+			glyph.name = NewName
+
+def importGlyphsDocument(Font, GlyphsDoc, Statistics=None, State=None):
+	"""Read the document into the empty Font. Returns False if the font can not be converted.
+
+	If State is a dict, the state of the import is stored in it for updateGlyphsDocument.
+	"""
+	if Statistics is None:
+		Statistics = Stats("Glyphs Import")
+	try:
+		glyphsConvert.convertName = GlyphsDoc["disablesNiceNames"] != None
+	except:
+		pass
+	with Statistics.stage("setFontInfo"):
+		FontInfoIsValid = setFontInfo(Font, GlyphsDoc)
+	if not FontInfoIsValid:
+		return False
+	if State is not None and not hasattr(GlyphsDoc["glyphs"], "text"):
+		State = None # the glyphs were not read from a file, so there is nothing to compare them to
+	with Statistics.stage("readGlyphs"):
+		SpecialLayers = readGlyphs(Font, GlyphsDoc, Statistics, State)
+	if len(SpecialLayers) > 0:
+		print "The font has brace or bracket layers. They are not supported in FontLab and were not imported.\n(%s)" % ", ".join(sorted(SpecialLayers))
+	with Statistics.stage("readKerning"):
+		readKerning(Font, GlyphsDoc, Statistics, State)
+	# the features use the names from the document
+	GlyphNames = set(glyph.name for glyph in Font.glyphs)
+	with Statistics.stage("setLegacyNames"):
+		setLegacyNames(Font)
+	with Statistics.stage("readFeatures"):
+		readFeatures(Font, GlyphsDoc, GlyphNames)
+	if State is not None:
+		State["font"] = fontHash(GlyphsDoc)
+	return True
+
+def updateGlyphsDocument(Font, GlyphsDoc, State, Statistics=None):
+	"""Apply the changes of the document since the import that State describes to Font.
+
+	Only the added, removed and changed glyphs, the glyphs that use them as components and
+	the kerning of the glyphs whose pairs changed are touched. State is updated. Returns False,
+	without changing Font, if anything but the glyphs and the kerning changed or Font is not
+	the font of that import. It has to be imported completely then.
+	"""
+	if Statistics is None:
+		Statistics = Stats("Glyphs Update")
+	try:
+		glyphsConvert.convertName = GlyphsDoc["disablesNiceNames"] != None
+	except:
+		pass
+	if not hasattr(GlyphsDoc["glyphs"], "text") or State.get("font") != fontHash(GlyphsDoc):
+		return False
+	Names = State["names"]
+	Glyphs = Font.glyphs
+	if len(Glyphs) != len(Names):
+		return False
+	for Index in range(len(Names)):
+		if Glyphs[Index].name != NotNiceName(Names[Index]):
+			return False
+	with Statistics.stage("updateGlyphs"):
+		SpecialLayers, Dirty = updateGlyphs(Font, GlyphsDoc, State, Statistics)
+	if len(SpecialLayers) > 0:
+		print "The font has brace or bracket layers. They are not supported in FontLab and were not imported.\n(%s)" % ", ".join(sorted(SpecialLayers))
+	with Statistics.stage("updateKerning"):
+		updateKerning(Font, GlyphsDoc, State, Dirty, Statistics)
+	return True
+
+# Export
+
+def convertFLSToUnicode(Value):
+	Uni = None
+	try:
+		Uni = Value.decode("UTF-8")
+	except:
+		try:
+			Uni = unicode(Value, 'cp1252')
+		except:
+			pass
+	return Uni
+
+def _nodeRecords(Nodes, MasterCount):
+	"""The outline of the glyph or of its mask as node records with plain (x, y) tuples."""
+	Records = []
+	Masters = range(MasterCount)
+	for node in Nodes:
+		if node.type == nMOVE:
+			Type = MOVE
+		elif node.count > 1:
+			Type = CURVE
+		else:
+			Type = LINE
+		nodeRecord = NodeRecord(Type, None, 1, node.alignment != nSHARP)
+		nodeRecord.points = [[(Point.x, Point.y) for Point in node.Layer(masterIndex)] for masterIndex in Masters]
+		Records.append(nodeRecord)
+	return Records
+
+def recordFromGlyph(glyph, font):
+	"""Return a GlyphRecord with the glyph data of all masters."""
+	MasterCount = glyph.layers_number
+	Record = GlyphRecord(glyph.name, MasterCount)
+	Record.unicode = glyph.unicode
+	Record.mark = glyph.mark
+	Record.widths = [glyph.GetMetrics(masterIndex).x for masterIndex in range(MasterCount)]
+	Record.nodes = _nodeRecords(glyph.nodes, MasterCount)
+	if glyph.mask is not None:
+		Record.background = _nodeRecords(glyph.mask.nodes, MasterCount)
+	for component in glyph.components:
+		Transforms = [(component.scales[masterIndex].x, component.scales[masterIndex].y, component.deltas[masterIndex].x, component.deltas[masterIndex].y) for masterIndex in range(MasterCount)]
+		Record.components.append(ComponentRecord(font[component.index].name, Transforms))
+	for Hints, Records in ((glyph.vhints, Record.vhints), (glyph.hhints, Record.hhints)):
+		for hint in Hints:
+			hintRecord = HintRecord(0, 0, 0)
+			hintRecord.positions = [hint.positions[masterIndex] for masterIndex in range(MasterCount)]
+			hintRecord.widths = [hint.widths[masterIndex] for masterIndex in range(MasterCount)]
+			Records.append(hintRecord)
+	for link in glyph.vlinks:
+		Record.vlinks.append(LinkRecord(link.node1, link.node2))
+	for link in glyph.hlinks:
+		Record.hlinks.append(LinkRecord(link.node1, link.node2))
+	for anchor in glyph.anchors:
+		anchorRecord = AnchorRecord(anchor.name, None, 0)
+		for masterIndex in range(MasterCount):
+			Position = anchor.Layer(masterIndex)
+			anchorRecord.positions.append((Position.x, Position.y))
+		Record.anchors.append(anchorRecord)
+	return Record
+
+def makePlist(font, Statistics=None, Manifest=None):
+	"""Return the top level dict of the .glyphs file for the font.
+
+	"glyphs" is a generator that makes each glyph while the file is written, so the
+	dict is meant to be written with glyphsFormat.writeGlyphsDocument. With a
+	glyphsManifest.ExportManifest, unchanged glyphs reuse their text from the
+	last export.
+	"""
+	if Statistics is None:
+		Statistics = Stats("makePlist")
+	classes = font.classes
+	ClassesDict, FirstClasses, SecondClasses = kerningClassKeys(classes, [(font.GetClassLeft(i), font.GetClassRight(i)) for i in range(len(classes))])
+
+	#kerning
+	Font = {}
+	if font.pref_family_name is not None:
+		Font["familyName"] = font.pref_family_name
+	elif font.family_name is not None:
+		Font["familyName"] = font.family_name
+
+	WeightValues = {
+		"Thin" : 250,
+		"ExtraLight" : 250,
+		"UltraLight" : 250,
+		"Light" : 300,
+		"Normal" : 400,
+		"Regular" : 400,
+		"Medium" : 500,
+		"SemiBold" : 600,
+		"DemiBold" : 600,
+		"Bold" : 700,
+		"ExtraBold" : 800,
+		"UltraBold" : 800,
+		"Black" : 900,
+		"Heavy" : 900,
+		"Fat" : -1,
+		"ExtraBlack" : -1,
+	}
+	WidthMap = {
+		"Ultra-condensed" : "Ultra Condensed",
+		"Extra-condensed" : "Extra Condensed",
+		"Condensed" : "Condensed",
+		"Semi-condensed" : "SemiCondensed",
+		"Normal" : "Medium (normal)",
+		"Medium (normal)" : "Medium (normal)",
+		"Semi-expanded" : "Semi Expanded",
+		"Expanded" : "Expanded",
+		"Extra-expanded" : "Extra Expanded",
+		"Ultra-expanded" : "Ultra Expanded"
+	}
+
+
+	Instance = {}
+	if font.pref_style_name is not None:
+		Instance["name"] = font.pref_style_name
+	elif font.style_name is not None:
+		Instance["name"] = font.style_name
+	else:
+		Instance["name"] = "Regular"
+	if font.weight and len(font.weight) > 0:
+		Instance["weightClass"] = font.weight
+	if font.width and len(font.width) > 0 and font.width in WidthMap.keys():
+		Instance["widthClass"] = WidthMap[font.width]
+
+	CustomParameters = []
+	# if font.ttinfo.os2_us_weight_class != WeightValues[font.weight]: # There seems to be a bug, os2_us_weight_class is always 400
+	# 	CustomParameters.append({"name":"openTypeOS2WeightClass", "value": font.ttinfo.os2_us_weight_class})
+	if len(CustomParameters) > 0:
+		Instance["customParameters"] = CustomParameters
+
+	fontStyle = font.font_style
+	if (fontStyle & 1) == 1:
+		Instance["isItalic"] = 1
+	if (fontStyle & 32) == 32:
+		Instance["isBold"] = 1
+
+	if len(Instance) > 0:
+		Font["instances"] = [Instance]
+
+
+	Font["gridLength"] = 1
+	Font["unitsPerEm"] = font.upm
+	FontMasters = []
+
+	# Font Info
+	FontInfoMapping = {
+		"designer":"designer",
+		"designer_url":"designerURL",
+		"source":"manufacturer",
+		"vendor_url":"manufacturerURL",
+		"copyright":"copyright"
+	}
+	for FLKey, GlyphsKey in FontInfoMapping.iteritems():
+		Value = getattr(font, FLKey)
+		if Value and len(Value) > 0:
+			Value = convertFLSToUnicode(Value)
+			if Value is not None:
+				Font[GlyphsKey] = Value
+			else:
+				print "!!  invalid character or encoding in Font Info field: ", FLKey
+
+	CustomParametersMapping = {
+		"trademark":"trademark",
+		"notice":"description",
+		"license":"license",
+		"license_url":"licenseURL",
+		#"vendor":"openTypeOS2VendorID",
+	}
+
+	Sec = getattr(font.ttinfo, "head_creation")[0]
+	if Sec < 0:
+		Font["date"] = time.strftime("%Y-%m-%d %H:%M:%S +0000", time.gmtime(Sec + 2212126081))#"2013-04-01 21:32:44 +0000";
+
+		# head_creation [-2147483596,0] kleinster vorkommender Wert.
+		# head_creation [ 2147483400,0] wenn fünf Minuten früher dann kommt das dabei heraus.
+
+	Font["versionMajor"] = font.version_major
+	Font["versionMinor"] = font.version_minor
+
+	CustomParameters = []
+	for FLKey, GlyphsKey in CustomParametersMapping.iteritems():
+		Value = None
+		if len(FLKey.split(".")) > 1:
+			FLKeyList = FLKey.split(".")
+			obj = font
+			for Key in FLKeyList:
+				obj = getattr(obj, Key)
+			Value = obj
+		else:
+			Value = getattr(font, FLKey)
+		if Value and len(Value) > 0:
+			Value = convertFLSToUnicode(Value)
+			if Value is not None:
+				CustomParameters.append({"name":GlyphsKey, "value": Value})
+			else:
+				print "!!! invalid character or encoding in Font Info field: ", FLKey
+
+	if font.vendor and len(font.vendor) > 0 and font.vendor.upper() != "PYRS":
+		CustomParameters.append({"name":"openTypeOS2VendorID", "value": font.vendor.decode('UTF-8')})
+	fsType = font.ttinfo.os2_fs_type
+	fsTypeList = []
+
+
+	if fsType & 2 == 2:
+		fsTypeList.append(1)
+	if fsType & 4 == 4:
+		fsTypeList.append(2)
+	if fsType & 8 == 8:
+		fsTypeList.append(3)
+	if fsType & 256 == 256:
+		fsTypeList.append(8)
+
+	if len(fsTypeList) > 0:
+		CustomParameters.append({"name":"openTypeOS2Type", "value": fsTypeList})
+
+	GlyphOrder = []
+	for glyph in font.glyphs:
+		if glyph.name != ".notdef":
+			GlyphOrder.append(glyph.name)
+	CustomParameters.append({"name":"glyphOrder", "value": GlyphOrder})
+
+	if len(CustomParameters) > 0:
+		Font["customParameters"] = CustomParameters
+
+	Font["disablesAutomaticAlignment"] = True
+	print "Font is written with \"Disables Automatic Alignment\" activated. Please review this setting in Font Info."
+
+	MasterCount = font[0].layers_number
+	for i in range(MasterCount):
+		FontMaster = {}
+		FontMaster["ascender"] = font.ascender[i]
+		FontMaster["capHeight"] = font.cap_height[i]
+		FontMaster["descender"] = font.descender[i]
+		FontMaster["xHeight"] = font.x_height[i]
+		FontMaster["italicAngle"] = -font.italic_angle
+		FontMaster["id"] = ("UUID%d" % i)
+		FontMaster["weight"] = "Regular";
+		FontMaster["weightValue"] = 100;
+		FontMaster["width"] = "Regular";
+		FontMaster["widthValue"] = 100;
+		FontMasters.append(FontMaster)
+		if font.stem_snap_h_num > 0:
+			FontMaster["horizontalStems"] = []
+			for j in range(font.stem_snap_h_num):
+				FontMaster["horizontalStems"].append(font.stem_snap_h[i][j])
+		if font.stem_snap_v_num > 0:
+			FontMaster["verticalStems"] = []
+			for j in range(font.stem_snap_v_num):
+				FontMaster["verticalStems"].append(font.stem_snap_v[i][j])
+
+		AlignmentCount = font.blue_values_num
+		FontMaster["alignmentZones"] = []
+		for j in range(AlignmentCount-1, 0, -2):
+			FontMaster["alignmentZones"].append("{%d, %d}" %( font.blue_values[i][j-1] , font.blue_values[i][j] - font.blue_values[i][j-1]))
+
+		AlignmentCount = font.other_blues_num
+
+		for j in range(AlignmentCount-1, 0, -2):
+			FontMaster["alignmentZones"].append("{%d, %d}" %( font.other_blues[i][j-1] , font.other_blues[i][j] - font.other_blues[i][j-1]))
+
+
+	if len(FontMasters) == 2:
+		try:
+			VStem1 = FontMasters[0]["verticalStems"][0]
+			VStem2 = FontMasters[1]["verticalStems"][0]
+			if VStem2 != VStem1 and VStem1 != 0:
+				if VStem1 < VStem2:
+					FontMasters[0]["weight"] = "Light"
+					FontMasters[0]["weightValue"] = VStem1
+					FontMasters[1]["weight"] = "Bold"
+					FontMasters[1]["weightValue"] = VStem2
+				else:
+					FontMasters[1]["weight"] = "Light"
+					FontMasters[1]["weightValue"] = VStem1
+					FontMasters[0]["weight"] = "Bold"
+					FontMasters[0]["weightValue"] = VStem2
+		except:
+			pass
+
+	Font["fontMaster"] = FontMasters
+
+	Font["kerning"] = _kerningDict(font, FontMasters, FirstClasses, SecondClasses, Statistics)
+	# the glyphs are made while the file is written
+	Font["glyphs"] = _glyphDicts(font, FontMasters, ClassesDict, Statistics, Manifest)
+	return Font
+
+def _kerningDict(font, FontMasters, FirstClasses, SecondClasses, Statistics):
+	Kerning = {}
+	for FontMaster in FontMasters:
+		Kerning[FontMaster["id"]] = {}
+	MasterKerning = [Kerning[FontMaster["id"]] for FontMaster in FontMasters]
+
+	# the kerning keys of each glyph index, the key glyphs of the classes stand for their class
+	GlyphNames = [glyph.name for glyph in font.glyphs]
+	LeftKeys = [Name in FirstClasses and "@MMK_L_" + Name or Name for Name in GlyphNames]
+	RightKeys = [Name in SecondClasses and "@MMK_R_" + Name or Name for Name in GlyphNames]
+
+	for glyphIndex, glyph in enumerate(font.glyphs):
+		KerningPairs = glyph.kerning
+		if len(KerningPairs) > 0:
+			firstKey = LeftKeys[glyphIndex]
+			MasterPairs = [Pairs.setdefault(firstKey, {}) for Pairs in MasterKerning]
+			for kerningPair in KerningPairs:
+				secondKey = RightKeys[kerningPair.key]
+				Values = kerningPair.values
+				for masterIndex, Pairs in enumerate(MasterPairs):
+					if secondKey not in Pairs:
+						Pairs[secondKey] = Values[masterIndex]
+			Statistics.count("kerning pairs", len(KerningPairs))
+	return Kerning
+
+def _glyphDicts(font, FontMasters, ClassesDict, Statistics, Manifest):
+	MasterIds = [FontMaster["id"] for FontMaster in FontMasters]
+	for glyph in font.glyphs:
+		Record = recordFromGlyph(glyph, font)
+		Keys = ClassesDict.get(glyph.name)
+		if Keys is not None:
+			Record.rightKerningGroup = Keys.get("l")
+			Record.leftKerningGroup = Keys.get("r")
+
+		Statistics.count("glyphs")
+		Statistics.count("nodes", len(Record.nodes))
+		if Manifest is not None:
+			Hash = recordHash(Record, MasterIds)
+			Manifest.add(Record.name, Hash)
+			Text = Manifest.glyphText(Record.name, Hash)
+			if Text is not None:
+				Statistics.count("reused glyphs")
+				yield Text
+				continue
+		yield glyphDict(Record, FontMasters)
+
+def writeFeatures(font, Dict):
+	Prefix = {}
+	if font.ot_classes is not None and len(font.ot_classes) > 0:
+		Prefix["code"] = font.ot_classes.strip()
+		Prefix["name"] = "FontLab OTPanel"
+		Dict["featurePrefixes"] = [Prefix]
+
+	Classes = []
+	for ClassText in font.classes:
+		Class = classDict(ClassText)
+		if Class is not None:
+			Classes.append(Class)
+	if len(Classes) > 0:
+		Dict["classes"] = Classes
+	Features = []
+	for FeatureText in font.features:
+		if FeatureText.tag == "kern":
+			continue
+		Feature = featureDict(FeatureText.tag, FeatureText.value)
+		if Feature is not None:
+			Features.append(Feature)
+	if len(Features) > 0:
+		Dict["features"] = Features
+	return Dict
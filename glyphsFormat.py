@@ -0,0 +1,392 @@
+"""Reading and writing of the .glyphs file format without loading the whole file."""
+# -*- coding: utf-8 -*-
+#
+# A .glyphs file is an old style ASCII property list. The file is memory
+# mapped and tokenized on demand. The "glyphs" array is only scanned for
+# the position of each glyph, the glyphs are parsed one by one when they
+# are requested. So the memory needed is about the size of one glyph.
+# Writing works the other way round: lists can be generators, so each glyph
+# is written as soon as it is made.
+
+import os
+import re
+import mmap
+import tempfile
+from array import array
+
+__all__ = ["readGlyphsDocument", "writeGlyphsDocument", "PlistWriter", "PlistText", "PlistData", "parsePlist", "GlyphsDocument", "GlyphList", "decodeNodes",
+	"nodeReferences", "nodeReferenceMap", "OFFCURVE", "LINE", "CURVE", "QCURVE"]
+
+_Token = re.compile(r'''
+	(?:\s+|//[^\n]*|/\*.*?\*/)*
+	(?:
+		([{}()=;,])
+		|"((?:[^"\\]|\\.)*)"
+		|([\w.$:+\-@/]+)
+		|<([0-9A-Fa-f\s]*)>
+	)''', re.S | re.X)
+
+# node lists and the like: a list of simple quoted strings
+_StringList = re.compile(r'(?:\s*"[^"\\]*"\s*,)*\s*"[^"\\]*"\s*\)')
+_ListString = re.compile(r'"([^"\\]*)"')
+
+_Skip = re.compile(r'"(?:[^"\\]|\\.)*"|//[^\n]*|/\*.*?\*/|[(){}]', re.S)
+
+_Escape = re.compile(r'\\(U[0-9A-Fa-f]{4}|[0-7]{1,3}|.)', re.S)
+_EscapeChars = {"n": u"\n", "t": u"\t", "r": u"\r", "a": u"\a", "b": u"\b", "f": u"\f", "v": u"\v"}
+
+PUNCT, STRING, DATA = 1, 2, 4
+
+# node type codes returned by decodeNodes
+OFFCURVE, LINE, CURVE, QCURVE = 0, 1, 2, 3
+
+_Node = re.compile(r'([-+.\deE]+) ([-+.\deE]+) (LINE|CURVE|OFFCURVE|QCURVE)( SMOOTH)?')
+_NodeTypes = {"OFFCURVE": OFFCURVE, "LINE": LINE, "CURVE": CURVE, "QCURVE": QCURVE}
+
+# strings that are written without quotes, and the characters that need escaping in quoted strings
+_Unquoted = re.compile(r'[A-Za-z0-9._]+\Z')
+_Unsafe = re.compile(ur'[^\x20\x21\x23-\x5b\x5d-\x7e]')
+_EscapedChars = {u"\\": "\\\\", u'"': '\\"', u"\n": "\\012", u"\t": "\\011"}
+
+def _unescapeMatch(Match):
+	Code = Match.group(1)
+	if Code[0] == "U" and len(Code) == 5:
+		return unichr(int(Code[1:], 16))
+	if Code[0] in "01234567":
+		return unichr(int(Code, 8))
+	return _EscapeChars.get(Code, Code)
+
+def _escapeMatch(Match):
+	Char = Match.group(0)
+	if Char in _EscapedChars:
+		return _EscapedChars[Char]
+	Code = ord(Char)
+	if Code < 0x20:
+		return "\\%03o" % Code
+	if Code > 0xFFFF:
+		Code -= 0x10000
+		return "\\U%04X\\U%04X" % (0xD800 + (Code >> 10), 0xDC00 + (Code & 0x3FF))
+	return "\\U%04X" % Code
+
+class PlistParser(object):
+	"""Recursive descent parser over a string or memory map."""
+
+	def __init__(self, Buffer, Position=0):
+		self.buffer = Buffer
+		self.position = Position
+
+	def error(self, Message):
+		raise ValueError("%s at offset %d" % (Message, self.position))
+
+	def nextToken(self):
+		Match = _Token.match(self.buffer, self.position)
+		if Match is None:
+			self.error("Unexpected content")
+		self.position = Match.end()
+		Kind = Match.lastindex
+		if Kind == 1:
+			return PUNCT, Match.group(1)
+		elif Kind == 2:
+			Text = Match.group(2).decode("utf-8")
+			if "\\" in Text:
+				Text = _Escape.sub(_unescapeMatch, Text)
+			return STRING, Text
+		elif Kind == 3:
+			return STRING, Match.group(3).decode("utf-8")
+		return DATA, PlistData("".join(Match.group(4).split()).decode("hex"))
+
+	def parseValue(self, Token=None):
+		if Token is None:
+			Token = self.nextToken()
+		Kind, Value = Token
+		if Kind != PUNCT:
+			return Value
+		if Value == "{":
+			return self.parseDict()
+		if Value == "(":
+			return self.parseList()
+		self.error("Unexpected '%s'" % Value)
+
+	def parseDict(self, Hooks=None):
+		Dict = {}
+		while True:
+			Kind, Key = self.nextToken()
+			if Kind == PUNCT:
+				if Key == "}":
+					return Dict
+				self.error("Expected a key, found '%s'" % Key)
+			Kind, Value = self.nextToken()
+			if Kind != PUNCT or Value != "=":
+				self.error("Expected '=' after key '%s'" % Key)
+			if Hooks is not None and Key in Hooks:
+				Dict[Key] = Hooks[Key](self)
+			else:
+				Dict[Key] = self.parseValue()
+			Kind, Value = self.nextToken()
+			if Kind != PUNCT or Value != ";":
+				self.error("Expected ';' after value of '%s'" % Key)
+
+	def parseList(self):
+		Match = _StringList.match(self.buffer, self.position)
+		if Match is not None:
+			List = [Item.decode("utf-8") for Item in _ListString.findall(self.buffer, self.position, Match.end())]
+			self.position = Match.end()
+			return List
+		List = []
+		Token = self.nextToken()
+		if Token == (PUNCT, ")"):
+			return List
+		while True:
+			List.append(self.parseValue(Token))
+			Kind, Value = self.nextToken()
+			if Kind == PUNCT and Value == ")":
+				return List
+			if Kind != PUNCT or Value != ",":
+				self.error("Expected ',' or ')' in list")
+			Token = self.nextToken()
+			if Token == (PUNCT, ")"):
+				return List
+
+	def scanList(self):
+		"""Skips a list of dicts and returns the (start, end) offsets of its elements."""
+		Kind, Value = self.nextToken()
+		if Kind != PUNCT or Value != "(":
+			self.error("Expected a list")
+		Spans = []
+		Depth = 1
+		for Match in _Skip.finditer(self.buffer, self.position):
+			Char = Match.group(0)
+			if Char == "{" or Char == "(":
+				if Depth == 1 and Char == "{":
+					Start = Match.start()
+				Depth += 1
+			elif Char == "}" or Char == ")":
+				Depth -= 1
+				if Depth == 1 and Char == "}":
+					Spans.append((Start, Match.end()))
+				elif Depth == 0:
+					self.position = Match.end()
+					return Spans
+		self.error("Unterminated list")
+
+class PlistText(str):
+	"""A value that is already written as plist text, e.g. a glyph from an earlier export."""
+
+class PlistData(str):
+	"""The bytes of a <data> value. Written back as <hex>, not as a string."""
+
+class PlistWriter(object):
+	"""Writes values as an old style ASCII plist, the way Glyphs writes its files.
+
+	Dict keys are sorted, so the same font always gives the same file. A list can
+	be any iterable; if it is not a list or tuple, each item is written out as soon
+	as it is made and its (start, end) offset in the file is added to self.offsets.
+	Such an item can be a PlistText.
+	"""
+
+	def __init__(self, File):
+		self.file = File
+		self.position = 0
+		self.offsets = []
+
+	def write(self, Value):
+		Parts = []
+		self._append(Parts, Value)
+		self._flush(Parts)
+
+	def _flush(self, Parts):
+		Text = "".join(Parts)
+		self.file.write(Text)
+		self.position += len(Text)
+		del Parts[:]
+
+	def _string(self, Value):
+		if isinstance(Value, PlistData):
+			return "<" + Value.encode("hex") + ">"
+		if _Unquoted.match(Value):
+			return str(Value)
+		if isinstance(Value, str):
+			if _Unsafe.search(Value) is None:
+				return '"' + Value + '"'
+			Value = Value.decode("utf-8", "replace")
+		return '"' + str(_Unsafe.sub(_escapeMatch, Value)) + '"'
+
+	def _append(self, Parts, Value):
+		if isinstance(Value, basestring):
+			Parts.append(self._string(Value))
+		elif isinstance(Value, bool):
+			Parts.append(Value and "1" or "0")
+		elif isinstance(Value, (int, long)):
+			Parts.append(str(Value))
+		elif isinstance(Value, float):
+			if Value == int(Value):
+				Parts.append(str(int(Value)))
+			else:
+				Parts.append(repr(Value))
+		elif isinstance(Value, dict):
+			Parts.append("{\n")
+			for Key in sorted(Value):
+				Parts.append(self._string(Key))
+				Parts.append(" = ")
+				self._append(Parts, Value[Key])
+				Parts.append(";\n")
+			Parts.append("}")
+		elif isinstance(Value, (list, tuple)):
+			Parts.append("(\n")
+			for Item in Value:
+				# most lists are node strings
+				if isinstance(Item, basestring):
+					Parts.append(self._string(Item))
+				else:
+					self._append(Parts, Item)
+				Parts.append(",\n")
+			if len(Value) == 0:
+				Parts.append(")")
+			else:
+				Parts[-1] = "\n)"
+		elif hasattr(Value, "__iter__"):
+			Separator = "(\n"
+			for Item in Value:
+				Parts.append(Separator)
+				self._flush(Parts)
+				Start = self.position
+				if isinstance(Item, PlistText):
+					Parts.append(Item)
+				else:
+					self._append(Parts, Item)
+				self._flush(Parts)
+				self.offsets.append((Start, self.position))
+				Separator = ",\n"
+			if Separator == "(\n":
+				Parts.append("(")
+			Parts.append("\n)")
+		else:
+			raise TypeError("Can not write %r to a .glyphs file" % (Value,))
+
+class GlyphList(object):
+	"""The glyphs of a document. Each access parses the glyph from the file."""
+
+	def __init__(self, Buffer, Spans):
+		self._buffer = Buffer
+		self._spans = Spans
+
+	def __len__(self):
+		return len(self._spans)
+
+	def __getitem__(self, Index):
+		return PlistParser(self._buffer, self._spans[Index][0]).parseValue()
+
+	def __iter__(self):
+		Parser = PlistParser(self._buffer)
+		for Start, End in self._spans:
+			Parser.position = Start
+			yield Parser.parseValue()
+
+	def text(self, Index):
+		"""The unparsed text of the glyph in the file."""
+		Start, End = self._spans[Index]
+		return self._buffer[Start:End]
+
+class GlyphsDocument(dict):
+	"""The top level dict of a .glyphs file. "glyphs" is a GlyphList."""
+
+	def __init__(self, Buffer):
+		dict.__init__(self)
+		self._buffer = Buffer
+		Parser = PlistParser(Buffer)
+		Kind, Value = Parser.nextToken()
+		if Kind != PUNCT or Value != "{":
+			Parser.error("Not a .glyphs file")
+		self.update(Parser.parseDict({"glyphs": self._readGlyphs}))
+		if "glyphs" not in self:
+			self["glyphs"] = GlyphList(Buffer, [])
+
+	def _readGlyphs(self, Parser):
+		return GlyphList(self._buffer, Parser.scanList())
+
+	def close(self):
+		if isinstance(self._buffer, mmap.mmap):
+			self._buffer.close()
+
+def readGlyphsDocument(Path):
+	"""Return a GlyphsDocument for the file at Path."""
+	File = open(Path, "rb")
+	try:
+		if os.fstat(File.fileno()).st_size == 0:
+			raise ValueError("The file is empty: %s" % Path)
+		Buffer = mmap.mmap(File.fileno(), 0, access=mmap.ACCESS_READ)
+	finally:
+		File.close()
+	return GlyphsDocument(Buffer)
+
+def writeGlyphsDocument(Path, Dict):
+	"""Write Dict as a .glyphs file. The file is replaced atomically.
+
+	Dict["glyphs"] can be a generator, see PlistWriter. Returns the (start, end)
+	offsets of the glyphs in the file if it is.
+	"""
+	Handle, TempPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(Path)))
+	File = os.fdopen(Handle, "wb", 1 << 16)
+	try:
+		try:
+			Writer = PlistWriter(File)
+			Writer.write(Dict)
+			File.write("\n")
+		finally:
+			File.close()
+	except:
+		os.remove(TempPath)
+		raise
+	os.chmod(TempPath, 0644)
+	os.rename(TempPath, Path)
+	return Writer.offsets
+
+def parsePlist(Text):
+	"""Parse a complete plist from a string."""
+	return PlistParser(Text).parseValue()
+
+def decodeNodes(Nodes):
+	"""Decode a list of node strings like "120 340 CURVE SMOOTH".
+	
+	Returns the parallel arrays x, y, type and smooth flag.
+	"""
+	Matches = _Node.findall("\n".join(Nodes))
+	if len(Matches) != len(Nodes):
+		raise ValueError("Invalid node in path: %s" % ", ".join(Nodes))
+	NodeTypes = _NodeTypes
+	X = array("d", [float(Match[0]) for Match in Matches])
+	Y = array("d", [float(Match[1]) for Match in Matches])
+	Types = array("b", [NodeTypes[Match[2]] for Match in Matches])
+	Smooth = array("b", [len(Match[3]) > 0 for Match in Matches])
+	return X, Y, Types, Smooth
+
+# Hints and links refer to nodes by "{path index, node index}". FontLab has one
+# node with three points for a curve segment. The outline is described by a
+# sequence of (isMove, point count) tuples, one for each FontLab node.
+
+def nodeReferences(Nodes):
+	"""Return the (path index, node index) of the last point of each node."""
+	References = []
+	PathIndex = -1
+	NodeIndex = -1
+	for isMove, Count in Nodes:
+		if isMove:
+			PathIndex += 1
+			NodeIndex = -1
+		NodeIndex += Count
+		References.append((PathIndex, NodeIndex))
+	return References
+
+def nodeReferenceMap(Nodes):
+	"""Map each (path index, node index) to the index of the node containing that point."""
+	Map = {}
+	PathIndex = -1
+	NodeIndex = 0
+	for Index, (isMove, Count) in enumerate(Nodes):
+		if isMove:
+			PathIndex += 1
+			NodeIndex = 0
+		for i in range(NodeIndex, NodeIndex + Count):
+			Map[(PathIndex, i)] = Index
+		NodeIndex += Count
+	return Map
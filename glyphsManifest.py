@@ -0,0 +1,113 @@
+"""Sidecar manifests for the incremental export and import of .glyphs files."""
+# -*- coding: utf-8 -*-
+#
+# A manifest is stored next to the .glyphs file and remembers the state of the
+# glyphs of the last conversion. The export manifest is only used as long as the
+# size and the modification date of the .glyphs file are the ones it was written
+# for, so a file that was saved by Glyphs in between is converted completely. The
+# import manifest describes the FontLab font of the last import and is checked
+# against that font instead, see glyphsFL.updateGlyphsDocument.
+
+import os
+import mmap
+import marshal
+import tempfile
+
+from glyphsFormat import PlistText
+
+__all__ = ["readManifest", "writeManifest", "ExportManifest", "ImportManifest"]
+
+ManifestVersion = 1
+
+def _fileKey(Path):
+	if Path is None:
+		return None
+	Stat = os.stat(Path)
+	return (Stat.st_size, Stat.st_mtime)
+
+def readManifest(Path, GlyphsPath=None):
+	"""Return the data of the manifest at Path, or None if it does not belong to the current GlyphsPath."""
+	try:
+		File = open(Path, "rb")
+		try:
+			Version, Key, Data = marshal.load(File)
+		finally:
+			File.close()
+		if Version != ManifestVersion or Key != _fileKey(GlyphsPath):
+			return None
+	except (IOError, OSError, EOFError, ValueError, TypeError):
+		return None
+	return Data
+
+def writeManifest(Path, GlyphsPath, Data):
+	"""Write the manifest for the current state of GlyphsPath (None if it does not depend on it). The file is replaced atomically."""
+	Handle, TempPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(Path)))
+	File = os.fdopen(Handle, "wb")
+	try:
+		marshal.dump((ManifestVersion, _fileKey(GlyphsPath), Data), File)
+	finally:
+		File.close()
+	os.chmod(TempPath, 0644)
+	os.rename(TempPath, Path)
+
+class ExportManifest(object):
+	"""The hashes of the exported glyphs and the offsets of their text in the .glyphs file.
+
+	glyphText returns the text of a glyph from the last export if its hash is the same.
+	add collects the glyphs of the new export in their order, save stores them with
+	their offsets in the new file.
+	"""
+
+	def __init__(self, GlyphsPath):
+		self.glyphsPath = GlyphsPath
+		self.path = os.path.splitext(GlyphsPath)[0] + ".export-manifest"
+		self.names = []
+		self.hashes = []
+		self._glyphs = {}
+		self._buffer = None
+		if os.path.isfile(GlyphsPath):
+			Data = readManifest(self.path, GlyphsPath)
+			if Data is not None and os.path.getsize(GlyphsPath) > 0:
+				File = open(GlyphsPath, "rb")
+				try:
+					self._buffer = mmap.mmap(File.fileno(), 0, access=mmap.ACCESS_READ)
+				finally:
+					File.close()
+				self._glyphs = Data["glyphs"]
+
+	def glyphText(self, Name, Hash):
+		Glyph = self._glyphs.get(Name)
+		if Glyph is None or Glyph[0] != Hash:
+			return None
+		return PlistText(self._buffer[Glyph[1]:Glyph[2]])
+
+	def add(self, Name, Hash):
+		self.names.append(Name)
+		self.hashes.append(Hash)
+
+	def save(self, Offsets):
+		"""Write the manifest for the glyphs that were added, Offsets are their (start, end) in the new file."""
+		self.close()
+		if len(Offsets) != len(self.names):
+			return
+		Glyphs = {}
+		for Name, Hash, (Start, End) in zip(self.names, self.hashes, Offsets):
+			Glyphs[Name] = (Hash, Start, End)
+		writeManifest(self.path, self.glyphsPath, {"glyphs": Glyphs})
+
+	def close(self):
+		if self._buffer is not None:
+			self._buffer.close()
+			self._buffer = None
+
+class ImportManifest(object):
+	"""The state of the last import of a .glyphs file, see glyphsFL.importGlyphsDocument."""
+
+	def __init__(self, GlyphsPath):
+		self.path = os.path.splitext(GlyphsPath)[0] + ".import-manifest"
+
+	def read(self):
+		return readManifest(self.path)
+
+	def write(self, State):
+		writeManifest(self.path, None, State)
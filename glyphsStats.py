@@ -0,0 +1,98 @@
+"""Stage timers, counters and memory sampling for the Glyphs import and export."""
+# -*- coding: utf-8 -*-
+#
+#	Statistics = Stats("import")
+#	with Statistics.stage("readGlyphs"):
+#		readGlyphs(Font, Dict, Statistics)
+#	Statistics.count("nodes", len(glyph))
+#	print Statistics.report()
+#	Statistics.write(Path)
+
+import os
+import sys
+import time
+import json
+import tempfile
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+__all__ = ["Stats", "peakMemory"]
+
+def peakMemory():
+	"""Return the peak resident memory of the process in bytes, or None."""
+	if resource is None:
+		return None
+	Peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform != "darwin":
+		Peak = Peak * 1024 # Linux reports kilobytes
+	return Peak
+
+class _Stage(object):
+
+	def __init__(self, Statistics, Name):
+		self._statistics = Statistics
+		self._name = Name
+
+	def __enter__(self):
+		self._startTime = time.time()
+		return self
+
+	def __exit__(self, Type, Value, Traceback):
+		self._statistics.addStage(self._name, time.time() - self._startTime, Type is None)
+		return False
+
+class Stats(object):
+	"""Collects the time and peak memory of named stages and some counters."""
+
+	def __init__(self, Name):
+		self.name = Name
+		self.stages = []
+		self.counters = {}
+		self._startTime = time.time()
+
+	def stage(self, Name):
+		"""A context manager that times the enclosed stage."""
+		return _Stage(self, Name)
+
+	def addStage(self, Name, Duration, Finished=True):
+		self.stages.append({"name": Name, "time": Duration, "peakMemory": peakMemory(), "finished": Finished})
+
+	def count(self, Name, Value=1):
+		self.counters[Name] = self.counters.get(Name, 0) + Value
+
+	def summary(self):
+		return {
+			"name": self.name,
+			"time": time.time() - self._startTime,
+			"peakMemory": peakMemory(),
+			"stages": self.stages,
+			"counters": self.counters,
+		}
+
+	def report(self):
+		Summary = self.summary()
+		Lines = ["%s Time: %.2f s." % (self.name, Summary["time"])]
+		for Stage in self.stages:
+			Line = "    %-16s %8.2f s" % (Stage["name"], Stage["time"])
+			if Stage["peakMemory"] is not None:
+				Line += "    peak %.1f MB" % (Stage["peakMemory"] / 1048576.0)
+			if not Stage["finished"]:
+				Line += "    (failed)"
+			Lines.append(Line)
+		if len(self.counters) > 0:
+			Lines.append("    " + ", ".join(["%s: %d" % (Name, self.counters[Name]) for Name in sorted(self.counters)]))
+		return "\n".join(Lines)
+
+	def write(self, Path):
+		"""Write the summary as JSON. The file is replaced atomically."""
+		Handle, TempPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(Path)))
+		File = os.fdopen(Handle, "w")
+		try:
+			json.dump(self.summary(), File, indent=1, sort_keys=True)
+		finally:
+			File.close()
+		os.chmod(TempPath, 0644)
+		os.rename(TempPath, Path)
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""In-memory stand-in for the FontLab "FL" module.
+
+It implements the parts of the FontLab Font/Glyph/Node API that the Glyphs
+import and export use, so that they can run (and be tested and profiled)
+without FontLab:
+
+	try:
+		from FL import *
+	except ImportError:
+		from memoryFL import *
+"""
+
+import copy
+import json
+
+__all__ = ["fl", "Font", "Glyph", "Node", "Point", "Component", "Anchor", "Hint", "Link", "KerningPair",
+	"Feature", "NameRecord", "nMOVE", "nLINE", "nCURVE", "nOFF", "nSHARP", "nSMOOTH", "nFIXED"]
+
+nMOVE = 17
+nLINE = 1
+nCURVE = 35
+nOFF = 65
+
+nSHARP = 0
+nSMOOTH = 4096
+nFIXED = 12288
+
+# FontLab keeps the values of all possible masters
+MaxMasters = 16
+
+class Point(object):
+
+	def __init__(self, x=0, y=0):
+		if isinstance(x, Point):
+			x, y = x.x, x.y
+		self.x = x
+		self.y = y
+
+	def __repr__(self):
+		return "<Point: %s, %s>" % (self.x, self.y)
+
+class Node(object):
+
+	def __init__(self, type=None, point=None):
+		if isinstance(type, Node):
+			Other = type
+			self.type = Other.type
+			self.alignment = Other.alignment
+			self._layers = [[Point(p) for p in Layer] for Layer in Other._layers]
+			return
+		if type is None:
+			type = nLINE
+		self.type = type
+		self.alignment = nSHARP
+		Count = 1
+		if type == nCURVE:
+			Count = 3
+		if point is None:
+			point = Point()
+		self._layers = [[Point(point) for i in range(Count)]]
+
+	def __repr__(self):
+		return "<Node: type: %d, x: %s, y: %s>" % (self.type, self.x, self.y)
+
+	def _setMasterCount(self, MasterCount):
+		while len(self._layers) < MasterCount:
+			self._layers.append([Point(p) for p in self._layers[0]])
+
+	def Layer(self, masterIndex):
+		return self._layers[masterIndex]
+
+	points = property(lambda self: self._layers[0])
+	count = property(lambda self: len(self._layers[0]))
+	x = property(lambda self: self._layers[0][0].x)
+	y = property(lambda self: self._layers[0][0].y)
+
+class Component(object):
+
+	def __init__(self, index=0, delta=None, scale=None):
+		if isinstance(index, Component):
+			Other = index
+			self.index = Other.index
+			self.deltas = [Point(p) for p in Other.deltas]
+			self.scales = [Point(p) for p in Other.scales]
+			return
+		self.index = index
+		if delta is None:
+			delta = Point(0, 0)
+		if scale is None:
+			scale = Point(1, 1)
+		self.deltas = [Point(delta) for i in range(MaxMasters)]
+		self.scales = [Point(scale) for i in range(MaxMasters)]
+
+	delta = property(lambda self: self.deltas[0])
+	scale = property(lambda self: self.scales[0])
+
+class Anchor(object):
+
+	def __init__(self, name="", x=0, y=0):
+		if isinstance(name, Anchor):
+			Other = name
+			self.name = Other.name
+			self._layers = [Point(p) for p in Other._layers]
+			return
+		self.name = name
+		self._layers = [Point(x, y) for i in range(MaxMasters)]
+
+	def Layer(self, masterIndex):
+		return self._layers[masterIndex]
+
+	x = property(lambda self: self._layers[0].x)
+	y = property(lambda self: self._layers[0].y)
+
+class Hint(object):
+
+	def __init__(self, position=0, width=0):
+		self.positions = [position] * MaxMasters
+		self.widths = [width] * MaxMasters
+
+	position = property(lambda self: self.positions[0])
+	width = property(lambda self: self.widths[0])
+
+class Link(object):
+
+	def __init__(self, node1=0, node2=0):
+		self.node1 = node1
+		self.node2 = node2
+
+class KerningPair(object):
+
+	def __init__(self, key=0, value=0):
+		self.key = key
+		self.values = [value] * MaxMasters
+
+	value = property(lambda self: self.values[0])
+
+class Feature(object):
+
+	def __init__(self, tag="", value=""):
+		self.tag = tag
+		self.value = value
+
+class NameRecord(object):
+
+	def __init__(self, nid=0, pid=0, eid=0, lid=0, name=""):
+		self.nid = nid
+		self.pid = pid
+		self.eid = eid
+		self.lid = lid
+		self.name = name
+
+class Glyph(object):
+
+	def __init__(self, masters=1):
+		self.name = ""
+		self.unicode = -1
+		self.customdata = ""
+		self.note = ""
+		self.mark = 0
+		self.index = -1
+		self.layers_number = masters
+		self.nodes = []
+		self.components = []
+		self.anchors = []
+		self.hhints = []
+		self.vhints = []
+		self.hlinks = []
+		self.vlinks = []
+		self.kerning = _List()
+		self.mask = None
+		self._metrics = [Point(0, 0) for i in range(MaxMasters)]
+
+	def __repr__(self):
+		return "<Glyph: '%s', %d nodes>" % (self.name, len(self.nodes))
+
+	def __len__(self):
+		return len(self.nodes)
+
+	def __getitem__(self, index):
+		if 0 <= index < len(self.nodes):
+			return self.nodes[index]
+		return None
+
+	def Insert(self, node, index=None):
+		node = Node(node)
+		node._setMasterCount(self.layers_number)
+		if index is None:
+			index = len(self.nodes)
+		self.nodes.insert(index, node)
+
+	def DeleteNode(self, index):
+		if not 0 <= index < len(self.nodes):
+			return
+		Type = self.nodes[index].type
+		del self.nodes[index]
+		if Type == nMOVE and index < len(self.nodes) and self.nodes[index].type != nMOVE:
+			# the contour now starts at the next node
+			self.nodes[index].type = nMOVE
+
+	def Assign(self, glyph):
+		"""Replace everything but the index with a copy of the other glyph."""
+		Index = self.index
+		self.__dict__.update(copy.deepcopy(glyph.__dict__))
+		self.index = Index
+
+	def SetMetrics(self, point, masterIndex=0):
+		self._metrics[masterIndex] = Point(point)
+
+	def GetMetrics(self, masterIndex=0):
+		return self._metrics[masterIndex]
+
+	width = property(lambda self: self._metrics[0].x)
+
+	def dump(self):
+		"""The glyph as plain lists and dicts."""
+		MasterCount = self.layers_number
+		return {
+			"name": self.name,
+			"unicode": self.unicode,
+			"customdata": self.customdata,
+			"mark": self.mark,
+			"widths": [self._metrics[m].x for m in range(MasterCount)],
+			"nodes": [[node.type, node.alignment, [[(p.x, p.y) for p in node.Layer(m)] for m in range(MasterCount)]] for node in self.nodes],
+			"components": [[c.index, [(c.scales[m].x, c.scales[m].y, c.deltas[m].x, c.deltas[m].y) for m in range(MasterCount)]] for c in self.components],
+			"hhints": [[h.positions[:MasterCount], h.widths[:MasterCount]] for h in self.hhints],
+			"vhints": [[h.positions[:MasterCount], h.widths[:MasterCount]] for h in self.vhints],
+			"hlinks": [[l.node1, l.node2] for l in self.hlinks],
+			"vlinks": [[l.node1, l.node2] for l in self.vlinks],
+			"anchors": [[a.name, [(a.Layer(m).x, a.Layer(m).y) for m in range(MasterCount)]] for a in self.anchors],
+			"kerning": [[k.key, k.values[:MasterCount]] for k in self.kerning],
+		}
+
+class _List(list):
+
+	def clean(self):
+		del self[:]
+
+class _TTInfo(object):
+
+	def __init__(self):
+		self.os2_fs_type = 0
+		self.os2_us_weight_class = 400
+		self.head_creation = [0, 0]
+
+class _GlyphList(list):
+
+	def __init__(self, font):
+		list.__init__(self)
+		self._font = font
+
+	def append(self, glyph):
+		glyph.index = len(self)
+		list.append(self, glyph)
+
+	def __delitem__(self, index):
+		list.__delitem__(self, index)
+		for i in range(index, len(self)):
+			self[i].index = i
+		# like FontLab, drop the components and kerning pairs of the glyph and move those of the following glyphs
+		for glyph in self:
+			for Items, Key in ((glyph.components, "index"), (glyph.kerning, "key")):
+				for i in range(len(Items)-1, -1, -1):
+					Value = getattr(Items[i], Key)
+					if Value == index:
+						del Items[i]
+					elif Value > index:
+						setattr(Items[i], Key, Value - 1)
+
+class Font(object):
+
+	def __init__(self):
+		for Name in ("family_name", "style_name", "full_name", "font_name", "menu_name", "apple_name",
+			"pref_family_name", "pref_style_name", "mac_compatible", "weight", "width", "copyright",
+			"trademark", "notice", "designer", "designer_url", "vendor", "vendor_url", "source",
+			"license", "license_url", "version", "file_name", "note"):
+			setattr(self, Name, None)
+		self.version_major = 1
+		self.version_minor = 0
+		self.year = 0
+		self.upm = 1000
+		self.weight_code = 400
+		self.width_code = 5
+		self.font_style = 0
+		self.is_fixed_pitch = False
+		self.underline_position = -100
+		self.underline_thickness = 50
+		self.italic_angle = 0.0
+		self.modified = 0
+		self.ascender = [750] * MaxMasters
+		self.descender = [-250] * MaxMasters
+		self.cap_height = [700] * MaxMasters
+		self.x_height = [500] * MaxMasters
+		self.stem_snap_h_num = 0
+		self.stem_snap_v_num = 0
+		self.stem_snap_h = [[0] * 12 for i in range(MaxMasters)]
+		self.stem_snap_v = [[0] * 12 for i in range(MaxMasters)]
+		self.blue_values_num = 0
+		self.other_blues_num = 0
+		self.blue_values = [[0] * 14 for i in range(MaxMasters)]
+		self.other_blues = [[0] * 10 for i in range(MaxMasters)]
+		self.ttinfo = _TTInfo()
+		self.fontnames = _List()
+		self.axis = []
+		self.glyphs = _GlyphList(self)
+		self.features = []
+		self.ot_classes = ""
+		self._classes = []
+		self._classFlags = {}
+
+	def __repr__(self):
+		return "<Font: '%s', %d glyphs>" % (self.family_name, len(self.glyphs))
+
+	def __len__(self):
+		return len(self.glyphs)
+
+	def __getitem__(self, key):
+		if isinstance(key, basestring):
+			key = self.FindGlyph(key)
+		if 0 <= key < len(self.glyphs):
+			return self.glyphs[key]
+		return None
+
+	def FindGlyph(self, name):
+		for i in range(len(self.glyphs)):
+			if self.glyphs[i].name == name:
+				return i
+		return -1
+
+	def DefineAxis(self, name, type, shortName):
+		self.axis.append((name, type, shortName))
+
+	def _get_classes(self):
+		return list(self._classes)
+
+	def _set_classes(self, classes):
+		# the flags stay with the class indexes, like in FontLab
+		self._classes = list(classes)
+		for index in list(self._classFlags):
+			if index >= len(self._classes):
+				del self._classFlags[index]
+
+	classes = property(_get_classes, _set_classes)
+
+	def SetClassFlags(self, index, left, right):
+		self._classFlags[index] = (bool(left), bool(right))
+
+	def GetClassLeft(self, index):
+		return int(self._classFlags.get(index, (False, False))[0])
+
+	def GetClassRight(self, index):
+		return int(self._classFlags.get(index, (False, False))[1])
+
+	def dump(self):
+		"""The font as plain lists and dicts."""
+		Dump = {}
+		for Name, Value in self.__dict__.items():
+			if Name[0] != "_" and (Value is None or isinstance(Value, (basestring, int, long, float, bool))):
+				Dump[Name] = Value
+		for Name in ("ascender", "descender", "cap_height", "x_height", "stem_snap_h", "stem_snap_v", "blue_values", "other_blues", "axis"):
+			Dump[Name] = getattr(self, Name)
+		Dump["os2_fs_type"] = self.ttinfo.os2_fs_type
+		Dump["fontnames"] = [(n.nid, n.pid, n.eid, n.lid, n.name) for n in self.fontnames]
+		Dump["classes"] = [(self._classes[i], self.GetClassLeft(i), self.GetClassRight(i)) for i in range(len(self._classes))]
+		Dump["features"] = [(f.tag, f.value) for f in self.features]
+		Dump["glyphs"] = [glyph.dump() for glyph in self.glyphs]
+		return Dump
+
+	def Save(self, filename):
+		"""Write the font as JSON, in place of a .vfb file."""
+		File = open(filename, "w")
+		try:
+			json.dump(self.dump(), File)
+		finally:
+			File.close()
+
+class _FontLab(object):
+
+	def __init__(self):
+		self.output = ""
+		self.font = None
+		self.fonts = []
+
+	def Add(self, font):
+		self.fonts.append(font)
+		self.font = font
+
+	def UpdateFont(self, index=-1):
+		pass
+
+	count = property(lambda self: len(self.fonts))
+
+fl = _FontLab()
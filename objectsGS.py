@@ -16,6 +16,8 @@ from robofab.objects.objectsBase import BaseFont, BaseKerning, BaseGroups, BaseI
 		BasePostScriptFontHintValues, postScriptHintDataLibKey, BasePostScriptGlyphHintValues
 
 import os
+import weakref
+from array import array
 from warnings import warn
 
 __all__ = ["CurrentFont", "CurrentGlyph", 'OpenFont', 'RFont', 'RGlyph', 'RContour', 'RPoint', 'RAnchor', 'RComponent', "NewFont"]
@@ -33,7 +35,6 @@ LOCAL_ENCODING = "macroman"
 if type(GSElement.parent) != type(GSGlyph.parent):
 	GSElement.parent = property(lambda self: self.valueForKey_("parent"))
 
-
 def CurrentFont():
 	"""Return a RoboFab font object for the currently selected font."""
 	if Glyphs.currentDocument:
@@ -150,43 +151,96 @@ class RFont(BaseFont):
 		self.info = RInfo(self)
 		
 		self._supportHints = False
-		self._RGlyphs = {}
-	
-	def keys(self):
-		keys = {}
-		for glyph in self._object.font.glyphs:
+		# the RGlyphs that are in use, by (glyph id, master), so each glyph is wrapped once
+		self._RGlyphs = weakref.WeakValueDictionary()
+		self._glyphCacheHits = 0
+		self._glyphCacheMisses = 0
+		self._glyphIndex = None
+		self._glyphCount = 0
+		self._groups = None
+		self._groupsKey = None
+	
+	def _invalidateGlyphIndex(self):
+		self._glyphIndex = None
+		self._invalidateGroups()
+	
+	def _invalidateGroups(self):
+		self._groups = None
+	
+	def _getGlyphIndex(self, rebuild=False):
+		# maps the glyph names to the GSGlyphs. Built on first use and again after glyphs were added, removed or renamed
+		# through RoboFab. Changes made in Glyphs can keep the glyph count, so a hit has to be checked (see _getGSGlyph)
+		# and whatever reads the whole index asks for a rebuild.
+		Glyphs = self._object.font.glyphs
+		if not rebuild and self._glyphIndex is not None and self._glyphCount == len(Glyphs):
+			return self._glyphIndex
+		GlyphIndex = {}
+		NamesById = {}
+		for glyph in Glyphs:
 			glyphName = glyph.name
-			if glyphName in keys:
+			if glyphName in GlyphIndex:
 				n = 1
-				while ("%s#%s" % (glyphName, n)) in keys:
+				while ("%s#%s" % (glyphName, n)) in GlyphIndex:
 					n += 1
 				newGlyphName = "%s#%s" % (glyphName, n)
 				print "RoboFab encountered a duplicate glyph name, renaming %r to %r" % (glyphName, newGlyphName)
 				glyphName = newGlyphName
 				glyph.setName_(glyphName)
-			keys[glyphName] = None
-		return keys.keys()
+			GlyphIndex[glyphName] = glyph
+			NamesById[glyph.id] = glyphName
+		self._glyphIndex = GlyphIndex
+		self._glyphNamesById = NamesById
+		self._glyphCount = len(Glyphs)
+		return GlyphIndex
+	
+	def _getGlyphNamesById(self, rebuild=False):
+		self._getGlyphIndex(rebuild)
+		return self._glyphNamesById
+	
+	def _getGSGlyph(self, glyphName):
+		GGlyph = self._getGlyphIndex().get(glyphName)
+		if GGlyph is None or GGlyph.name != glyphName or GGlyph.parent != self._object.font:
+			# the glyph may have been added, renamed or removed outside of RoboFab
+			GGlyph = self._object.font.glyphForName_(glyphName)
+			if GGlyph is not None:
+				self._invalidateGlyphIndex()
+		return GGlyph
+	
+	def _getRGlyph(self, GGlyph):
+		Key = (GGlyph.id, self._master)
+		glyph = self._RGlyphs.get(Key)
+		if glyph is not None and glyph._object == GGlyph:
+			self._glyphCacheHits += 1
+			return glyph
+		self._glyphCacheMisses += 1
+		glyph = RGlyph(GGlyph, self._master)
+		glyph.setParent(self)
+		self._RGlyphs[Key] = glyph
+		return glyph
+	
+	def glyphCacheInfo(self):
+		"""Return the hits and misses of the RGlyph cache and the number of glyphs in it."""
+		return {"hits": self._glyphCacheHits, "misses": self._glyphCacheMisses, "size": len(self._RGlyphs)}
+	
+	def keys(self):
+		return self._getGlyphIndex(rebuild=True).keys()
 
 	def has_key(self, glyphName):
-		glyph = self._object.font.glyphForName_(glyphName)
-		if glyph is None:
-			return False
-		else:
-			return True
+		return self._getGSGlyph(glyphName) is not None
 	
 	__contains__ = has_key
 	
 	def __setitem__(self, glyphName, glyph):
+		if self._getGSGlyph(glyphName) is not None:
+			self.removeGlyph(glyphName)
 		self._object.font.addGlyph_( glyph.naked() )
+		self._invalidateGlyphIndex()
 	
 	def __getitem__(self, glyphName):
-		GGlyph = self._object.font.glyphForName_(glyphName)
+		GGlyph = self._getGSGlyph(glyphName)
 		if GGlyph is None:
 			raise KeyError("Glyph '%s' not in font." % glyphName)
-		else:
-			glyph = RGlyph(GGlyph, self._master)
-			glyph.setParent(self)
-			return glyph
+		return self._getRGlyph(GGlyph)
 	
 	def __cmp__(self, other):
 		if not hasattr(other, '_object'):
@@ -208,6 +262,10 @@ class RFont(BaseFont):
 	def close(self):
 		self._object.close()
 	
+	def update(self):
+		"""Forget the cached glyph index and groups, after the font was changed in Glyphs."""
+		self._invalidateGlyphIndex()
+	
 	def _get_lib(self):
 		return self._object.font.userData.objectForKey_("org.robofab.ufoLib")
 	
@@ -224,24 +282,57 @@ class RFont(BaseFont):
 	
 	path = property(_get_path, doc="path of the font")
 	
+	def _getGroupsKey(self):
+		# a cheap check for glyphs or classes added in Glyphs. Everything else that changes the groups through
+		# RoboFab drops the cache, changes made in Glyphs need RFont.update()
+		Font = self._object.font
+		return (len(Font.glyphs), len(Font.classes))
+	
+	def _getGroups(self):
+		# the RGroups of the font, it also maps the glyph names to the names of the groups they are in.
+		# Built on first use and again after the groups, classes or glyphs changed.
+		Key = self._getGroupsKey()
+		if self._groups is not None and self._groupsKey == Key:
+			return self._groups
+		Font = self._object.font
+		try:
+			# each attribute for all glyphs or classes at once, not one by one through the bridge
+			Glyphs = Font.valueForKey_("glyphs")
+			Classes = Font.valueForKey_("classes")
+			GlyphNames = Glyphs.valueForKey_("name")
+			LeftGroups = Glyphs.valueForKey_("leftKerningGroupId")
+			RightGroups = Glyphs.valueForKey_("rightKerningGroupId")
+			ClassNames = Classes.valueForKey_("name")
+			ClassCodes = Classes.valueForKey_("code")
+		except AttributeError:
+			Glyphs = Font.glyphs
+			Classes = Font.classes
+			GlyphNames = [Glyph.name for Glyph in Glyphs]
+			LeftGroups = [Glyph.leftKerningGroupId() for Glyph in Glyphs]
+			RightGroups = [Glyph.rightKerningGroupId() for Glyph in Glyphs]
+			ClassNames = [Class.name for Class in Classes]
+			ClassCodes = [Class.code for Class in Classes]
+		Groups = {}
+		for GlyphName, LeftGroup, RightGroup in zip(GlyphNames, LeftGroups, RightGroups):
+			# KVC gives NSNull for a glyph without a group
+			if LeftGroup is not None and not isinstance(LeftGroup, NSNull):
+				Groups.setdefault(LeftGroup, []).append(GlyphName)
+			if RightGroup is not None and not isinstance(RightGroup, NSNull):
+				Groups.setdefault(RightGroup, []).append(GlyphName)
+		for ClassName, ClassCode in zip(ClassNames, ClassCodes):
+			Groups[ClassName] = ClassCode.split(" ")
+		groups = RGroups(Groups, _groupsByGlyph(Groups))
+		groups.setParent(self)
+		self._groups = groups
+		self._groupsKey = Key
+		return groups
+	
 	def _get_groups(self):
-		Dictionary = {}
-		for currGlyph in self._object.font.glyphs:
-			if currGlyph.leftKerningGroupId():
-				Group = Dictionary.get(currGlyph.leftKerningGroupId(), None)
-				if not Group:
-					Group = []
-					Dictionary[currGlyph.leftKerningGroupId()] = Group
-				Group.append(currGlyph.name)
-			if currGlyph.rightKerningGroupId():
-				Group = Dictionary.get(currGlyph.rightKerningGroupId(), None)
-				if not Group:
-					Group = []
-					Dictionary[currGlyph.rightKerningGroupId()] = Group
-				Group.append(currGlyph.name)
-		for aClass in self._object.font.classes:
-			Dictionary[aClass.name] = aClass.code.split(" ")
-		return Dictionary
+		return self._getGroups()
+	
+	def groupsForGlyph(self, glyphName):
+		"""Return the names of the groups that contain the glyph."""
+		return self._getGroups().groupsForGlyph(glyphName)
 	
 	def _set_groups(self, GroupsDict):
 		for currGroupKey in GroupsDict.keys():
@@ -266,43 +357,107 @@ class RFont(BaseFont):
 				newClass.setCode_( " ".join(GroupsDict[currGroupKey]))
 				newClass.setAutomatic_( False )
 				self._object.font.addClass_(newClass)
+		self._invalidateGroups()
 	
 	groups = property(_get_groups, _set_groups, doc="groups")
 	
-	def _get_kerning(self):
+	def _kerningItems(self):
+		# yields (left, right, value) for the kerning pairs of the master, with glyph names instead of glyph ids
 		FontMaster = self._object.font.masters[self._master]
 		GSKerning = self._object.font.kerning.objectForKey_(FontMaster.id)
+		if GSKerning is None:
+			return
+		NamesById = self._getGlyphNamesById(rebuild=True)
+		for LeftKey in GSKerning.allKeys():
+			LeftKerning = GSKerning.objectForKey_(LeftKey)
+			if LeftKey[0] != '@':
+				LeftKey = NamesById.get(LeftKey)
+				if LeftKey is None:
+					continue
+			for RightKey in LeftKerning.allKeys():
+				RightKerning = LeftKerning.objectForKey_(RightKey)
+				if RightKey[0] != '@':
+					RightKey = NamesById.get(RightKey)
+					if RightKey is None:
+						continue
+				yield LeftKey, RightKey, RightKerning
+	
+	def _get_kerning(self):
 		kerning = {}
-		if GSKerning != None:
-			for LeftKey in GSKerning.allKeys():
-				LeftKerning = GSKerning.objectForKey_(LeftKey)
-				if LeftKey[0] != '@':
-					LeftKey = self._object.font.glyphForId_(LeftKey).name
-				for RightKey in LeftKerning.allKeys():
-					RightKerning = LeftKerning.objectForKey_(RightKey)
-					if RightKey[0] != '@':
-						RightKey = self._object.font.glyphForId_(RightKey).name
-					kerning[(LeftKey, RightKey)] = RightKerning
+		for LeftKey, RightKey, Value in self._kerningItems():
+			kerning[(LeftKey, RightKey)] = Value
 		rk = RKerning(kerning)
 		rk.setParent(self)
 		return rk
 	
 	def _set_kerning(self, kerning):
-		FontMasterID = self._object.font.masters[self._master].id
-		LeftKerning = NSMutableDictionary.alloc().init()
-		Font = self._object.font
-		for pair in kerning:
-			Font.setKerningForFontMasterID_LeftKey_RightKey_Value_(FontMasterID, pair[0], pair[1], kerning[pair])
+		self.setKerningPairs(kerning)
 	
 	kerning = property(_get_kerning, _set_kerning, doc="groups")
 	
+	def kerningColumns(self):
+		"""Return the kerning of the master as three parallel arrays: the left keys, the right keys and the values (floats)."""
+		Lefts = []
+		Rights = []
+		Values = array("d")
+		for LeftKey, RightKey, Value in self._kerningItems():
+			Lefts.append(LeftKey)
+			Rights.append(RightKey)
+			Values.append(float(Value))
+		return Lefts, Rights, Values
+	
+	def setKerningPairs(self, kerning, clear=False):
+		"""Set many kerning pairs of the master at once.
+		
+		kerning maps (left, right) to the value, the keys are glyph names or group names ("@MMK_L_...").
+		The kerning of the master is built as a whole and replaces the entry of the master in the font
+		kerning, the other masters are not touched. The other pairs of the master are kept, unless clear
+		is True.
+		"""
+		Font = self._object.font
+		FontMasterID = Font.masters[self._master].id
+		MasterKerning = {}
+		OldKerning = Font.kerning.objectForKey_(FontMasterID)
+		if OldKerning is not None and not clear:
+			for LeftKey in OldKerning.allKeys():
+				MasterKerning[LeftKey] = dict(OldKerning.objectForKey_(LeftKey))
+		GlyphIndex = self._getGlyphIndex(rebuild=True)
+		Ids = {}
+		def glyphKey(Key):
+			if Key[0] == '@':
+				return Key
+			if Key not in Ids:
+				glyph = GlyphIndex.get(Key)
+				Ids[Key] = glyph is not None and glyph.id or None
+			return Ids[Key]
+		Skipped = 0
+		for pair in kerning:
+			LeftKey = glyphKey(pair[0])
+			RightKey = glyphKey(pair[1])
+			if LeftKey is None or RightKey is None:
+				Skipped += 1
+				continue
+			LeftKerning = MasterKerning.get(LeftKey)
+			if LeftKerning is None:
+				LeftKerning = MasterKerning[LeftKey] = {}
+			LeftKerning[RightKey] = kerning[pair]
+		GSKerning = NSMutableDictionary.alloc().init()
+		for LeftKey, LeftKerning in MasterKerning.iteritems():
+			GSKerning.setObject_forKey_(NSMutableDictionary.dictionaryWithDictionary_(LeftKerning), LeftKey)
+		Font.willChangeValueForKey_("kerning")
+		Font.kerning.setObject_forKey_(GSKerning, FontMasterID)
+		Font.didChangeValueForKey_("kerning")
+		if Skipped > 0:
+			warn("%d kerning pairs refer to glyphs that are not in the font and were skipped" % Skipped, RoboFabWarning)
+	
 	#
 	# methods for imitating GlyphSet?
 	#
 	
 	def getWidth(self, glyphName):
-		if self._object.font.glyphForName_(glyphName):
-			return self._object.font.glyphForName_(glyphName).layerForKey_(self._masterKey).width()
+		GGlyph = self._getGSGlyph(glyphName)
+		if GGlyph:
+			return GGlyph.layerForKey_(self._masterKey).width()
 		raise IndexError		# or return None?
 	
 	def save(self, path=None):
@@ -332,27 +487,22 @@ class RFont(BaseFont):
 	def getGlyph(self, glyphName):
 		# XXX getGlyph may have to become private, to avoid duplication
 		# with __getitem__
-		n = None
-		if self._RGlyphs.has_key(glyphName):
-			# have we served this glyph before? it should be in _object
-			n = self._RGlyphs[glyphName]
-		else:
-			# haven't served it before, is it in the glyphSet then?
-			n = RGlyph( self._object.font.glyphForName_(glyphName) )
-			self._RGlyphs[glyphName] = n
-			
-		if n is None:
+		GGlyph = self._getGSGlyph(glyphName)
+		if GGlyph is None:
 			raise KeyError, glyphName
-		return n
+		return self._getRGlyph(GGlyph)
 	
 	def newGlyph(self, glyphName, clear=True):
 		"""Make a new glyph"""
-		g = self._object.font.glyphForName_(glyphName)
+		g = self._getGSGlyph(glyphName)
 		if g is None:
 			g = GSGlyph(glyphName)
 			self._object.font.addGlyph_(g)
+			self._invalidateGlyphIndex()
 		elif clear:
 			g.layers[self._masterKey] = GSLayer()
+			# a kept RGlyph would still hold the old layer, its contours and metrics
+			self._RGlyphs.pop((g.id, self._master), None)
 		return self[glyphName]
 	
 	def insertGlyph(self, glyph, newGlyphName=None):
@@ -365,7 +515,11 @@ class RFont(BaseFont):
 		glyph.name = name
 		glyph.setParent(self)
 		glyph._hasChanged()
-		self._RGlyphs[name] = glyph
+		# like in objectsRF a glyph with the same name is replaced, Glyphs would keep both
+		if self._getGSGlyph(name) is not None:
+			self.removeGlyph(name)
+		self._object.font.addGlyph_(glyph.naked())
+		self._invalidateGlyphIndex()
 		# is the user adding a glyph that has the same
 		# name as one that was deleted earlier?
 		#if name in self._scheduledForDeletion:
@@ -386,8 +540,11 @@ class RFont(BaseFont):
 		# if self.has_key(glyphName) and glyphName not in self._scheduledForDeletion:
 		# 	self._scheduledForDeletion.append(glyphName)
 		# now delete the object
-		if glyphName in self._object.font.glyphs:
+		GGlyph = self._getGSGlyph(glyphName)
+		if GGlyph is not None:
+			self._RGlyphs.pop((GGlyph.id, self._master), None)
 			del self._object.font[glyphName]
+		self._invalidateGlyphIndex()
 		self._hasChanged()
 	
 	def _get_selection(self):
@@ -428,6 +585,8 @@ class RGlyph(BaseGlyph):
 			self._layer = GSLayer()
 			_GSGlyph.setLayer_forKey_(self._layer, self._layerID)
 		self._contours = None
+		self._metrics = {}
+		self._metricsCacheInfo = {"hits": 0, "misses": 0, "invalidations": 0}
 		
 	def __repr__(self):
 		font = "unnamed_font"
@@ -455,7 +614,51 @@ class RGlyph(BaseGlyph):
 		return len(self.contours)
 	
 	def _invalidateContours(self):
+		if self._contours is not None:
+			for contour in self._contours:
+				contour._invalidateData()
 		self._contours = None
+		self._invalidateMetrics()
+	
+	def _invalidateMetrics(self):
+		if self._metrics:
+			self._metricsCacheInfo["invalidations"] += 1
+			self._metrics = {}
+	
+	def _lastChange(self):
+		# Glyphs sets it on every change of the glyph, also those not made through RoboFab.
+		# Older versions do not have it, there only the explicit invalidation helps.
+		try:
+			return self._object.valueForKey_("lastChange")
+		except:
+			return None
+	
+	def _getMetric(self, key, getValue):
+		"""the cached value of box, LSB or RSB, getValue reads it from the layer"""
+		LastChange = self._lastChange()
+		if self._metrics.get("lastChange", LastChange) != LastChange:
+			self._invalidateMetrics()
+		Metrics = self._metrics
+		Metrics["lastChange"] = LastChange
+		if key in Metrics:
+			self._metricsCacheInfo["hits"] += 1
+			return Metrics[key]
+		self._metricsCacheInfo["misses"] += 1
+		Value = getValue()
+		if not self._isComposite():
+			# the bounds of a composite change with its base glyphs, so they are not kept
+			Metrics[key] = Value
+		return Value
+	
+	def metricsCacheInfo(self):
+		"""Return the hits, misses and invalidations of the cached box and margins."""
+		return dict(self._metricsCacheInfo)
+	
+	def _isComposite(self):
+		Composite = self._metrics.get("composite")
+		if Composite is None:
+			Composite = self._metrics["composite"] = len(self._layer.components) > 0
+		return Composite
 	
 	def _buildContours(self):
 		self._contours = []
@@ -477,6 +680,9 @@ class RGlyph(BaseGlyph):
 	def _get_contours(self):
 		if self._contours is None:
 			self._buildContours()
+		elif len(self._contours) != len(self._layer.paths):
+			self._invalidateContours()
+			self._buildContours()
 		return self._contours
 	
 	contours = property(_get_contours, doc="allow for iteration through glyph.contours")
@@ -484,11 +690,14 @@ class RGlyph(BaseGlyph):
 	def _hasNotChanged(self):
 		raise NotImplementedError
 	
-	def _get_box(self):
+	def _getLayerBox(self):
 		bounds = self._layer.bounds
 		bounds = (int(round(NSMinX(bounds))), int(round(NSMinY(bounds))), int(round(NSMaxX(bounds))), int(round(NSMaxY(bounds))))
 		return bounds
 	
+	def _get_box(self):
+		return self._getMetric("box", self._getLayerBox)
+	
 	box = property(_get_box, doc="the bounding box of the glyph: (xMin, yMin, xMax, yMax)")
 	
 	#
@@ -516,6 +725,9 @@ class RGlyph(BaseGlyph):
 		if newName == prevName:
 			return
 		self._object.name = newName
+		font = self.getParent()
+		if font is not None:
+			font._invalidateGlyphIndex()
 	
 	name = property(_get_name, _set_name)
 	
@@ -559,18 +771,20 @@ class RGlyph(BaseGlyph):
 	
 	
 	def _get_leftMargin(self):
-		return self._layer.LSB
+		return self._getMetric("LSB", lambda: self._layer.LSB)
 
 	def _set_leftMargin(self, value):
 		self._layer.setLSB_(value)
+		self._invalidateMetrics()
 	
 	leftMargin = property(_get_leftMargin, _set_leftMargin, doc="Left Side Bearing")
 		
 	def _get_rightMargin(self):
-		return self._layer.RSB
+		return self._getMetric("RSB", lambda: self._layer.RSB)
 	
 	def _set_rightMargin(self, value):
 		self._layer.setRSB_(value)
+		self._invalidateMetrics()
 	
 	rightMargin = property(_get_rightMargin, _set_rightMargin, doc="Right Side Bearing")
 	
@@ -579,6 +793,7 @@ class RGlyph(BaseGlyph):
 	
 	def _set_width(self, value):
 		self._layer.setWidth_(value)
+		self._invalidateMetrics()
 	
 	width = property(_get_width, _set_width, doc="width")
 	
@@ -605,6 +820,7 @@ class RGlyph(BaseGlyph):
 		"""append a component to the glyph"""
 		new = GSComponent(baseGlyph, offset, scale)
 		self._layer.addComponent_(new)
+		self._invalidateMetrics()
 	
 	def appendAnchor(self, name, position, mark=None):
 		"""append an anchor to the glyph"""
@@ -615,6 +831,7 @@ class RGlyph(BaseGlyph):
 	def removeContour(self, index):
 		"""remove  a specific contour from the glyph"""
 		self._layer.removePathAtIndex_(index)
+		self._invalidateContours()
 	
 	def removeAnchor(self, anchor):
 		"""remove  a specific anchor from the glyph"""
@@ -623,6 +840,7 @@ class RGlyph(BaseGlyph):
 	def removeComponent(self, component):
 		"""remove  a specific component from the glyph"""
 		self._layer.removeComponent_(component)
+		self._invalidateMetrics()
 	
 	def center(self, padding=None):
 		"""Equalise sidebearings, set to padding if wanted."""
@@ -635,10 +853,12 @@ class RGlyph(BaseGlyph):
 			e_right = (left + right) - e_left
 		self._layer.setLSB_(e_left)
 		self._layer.setRSB_(e_right)
+		self._invalidateMetrics()
 	
 	def decompose(self):
 		"""Decompose all components"""
 		self._layer.decomposeComponents()
+		self._invalidateMetrics()
 	
 	def clear(self, contours=True, components=True, anchors=True, guides=True):
 		"""Clear all items marked as True from the glyph"""
@@ -656,10 +876,12 @@ class RGlyph(BaseGlyph):
 		"""clear all contours"""
 		while len(self._layer.paths) > 0:
 			self._layer.removePathAtIndex_(0)
+		self._invalidateContours()
 	
 	def clearComponents(self):
 		"""clear all components"""
 		self._layer.setComponents_(NSMutableArray.array())
+		self._invalidateMetrics()
 	
 	def clearAnchors(self):
 		"""clear all anchors"""
@@ -680,7 +902,7 @@ class RGlyph(BaseGlyph):
 		# self._hasChanged()
 	
 	def update(self):
-		self._contours = None
+		self._invalidateContours()
 		GSGlyphsInfo.updateGlyphInfo_changeName_(self._object, False)
 	
 	def correctDirection(self, trueType=False):
@@ -689,6 +911,7 @@ class RGlyph(BaseGlyph):
 	def removeOverlap(self):
 		removeOverlapFilter = NSClassFromString("GlyphsFilterRemoveOverlap").alloc().init()
 		removeOverlapFilter.runFilterWithLayer_error_(self._layer, None)
+		self._invalidateContours()
 		
 	def _mathCopy(self):
 		""" copy self without contour, component and anchor data """
@@ -740,6 +963,35 @@ class RGlyphAnchorsProxy (object):
 RGlyph.anchors = property(lambda self: RGlyphAnchorsProxy(self._layer))
 
 
+class _ContourData(object):
+	"""The nodes of a GSPath as parallel arrays, read in one pass.
+	
+	valid is cleared when the contour is changed through RoboFab (or RGlyph.update is called),
+	the RContour then reads the path again.
+	"""
+	
+	__slots__ = ("nodes", "x", "y", "types", "smooth", "closed", "valid")
+	
+	def __init__(self, Path):
+		try:
+			# fetch each attribute of all nodes at once, not node by node through the bridge
+			Nodes = Path.valueForKey_("nodes")
+			Positions = [Value.pointValue() for Value in Nodes.valueForKey_("position")]
+			Types = Nodes.valueForKey_("type")
+			Connections = Nodes.valueForKey_("connection")
+		except AttributeError:
+			Nodes = Path.nodes
+			Positions = [Node.position for Node in Nodes]
+			Types = [Node.type for Node in Nodes]
+			Connections = [Node.connection for Node in Nodes]
+		self.nodes = list(Nodes)
+		self.x = array("d", [Position.x for Position in Positions])
+		self.y = array("d", [Position.y for Position in Positions])
+		self.types = array("i", list(Types))
+		self.smooth = array("b", [Connection == GSSMOOTH for Connection in Connections])
+		self.closed = bool(Path.closed)
+		self.valid = True
+
 class RContour(BaseContour):
 	
 	_title = "GSContour"
@@ -747,17 +999,42 @@ class RContour(BaseContour):
 	def __init__(self, object=None):
 		#BaseContour.__init__(self)
 		self._object  = object #GSPath
+		self._data = None
+		self._points = None
+		self._segments = None
 	
 	def __repr__(self):
-		return "<RContour with %d nodes>"%(len(self._object.nodes))
+		return "<RContour with %d nodes>"%(len(self))
 	def __len__(self):
-		return len(self._object.nodes)
+		return len(self._getData().types)
 	
 	def __getitem__(self, index):
-		if index < len(self.segments):
-			return self.segments[index]
+		segments = self.segments
+		if index < len(segments):
+			return segments[index]
 		raise IndexError
 	
+	def _getData(self):
+		if self._data is None or not self._data.valid:
+			self._data = _ContourData(self._object)
+			self._points = None
+			self._segments = None
+		return self._data
+	
+	def _invalidateData(self):
+		if self._data is not None:
+			self._data.valid = False
+		self._data = None
+		self._points = None
+		self._segments = None
+		glyph = self.getParent()
+		if glyph is not None:
+			glyph._invalidateMetrics()
+	
+	def _hasChanged(self):
+		self._invalidateData()
+		BaseContour._hasChanged(self)
+	
 	def _get_index(self):
 		return self.getParent().contours.index(self)
 	
@@ -770,54 +1047,47 @@ class RContour(BaseContour):
 	index = property(_get_index, _set_index, doc="index of the contour")
 	
 	def _get_points(self):
-		'''returns a list of RPoints, generated on demand from the GSPath.nodes'''
-		points = []
-		Node = None
-		for Node in self._object.nodes:
-			Type = MOVE
-			if Node.type == GSLINE:
-				Type = LINE
-			elif Node.type == GSCURVE:
-				Type = CURVE
-			elif Node.type == GSOFFCURVE:
-				Type = OFFCURVE
-			X = Node.position.x
-			Y = Node.position.y
-			_RPoint = RPoint(Node)
-			_RPoint.parent = self
-			_RPoint.smooth = Node.connection == GSSMOOTH
-			
-			points.append(_RPoint) #x=0, y=0, pointType=None, name=None):
-		
-		if not self._object.closed:
-			points[0].type = MOVE
-		
-		return points
+		'''returns a list of RPoints for the GSPath.nodes, kept until the contour changes'''
+		Data = self._getData()
+		if self._points is None:
+			points = []
+			for i in range(len(Data.nodes)):
+				_RPoint = RPoint(Data.nodes[i], Data, i)
+				_RPoint.parent = self
+				_RPoint._smooth = bool(Data.smooth[i])
+				points.append(_RPoint)
+			if not Data.closed and len(points) > 0:
+				points[0]._type = MOVE
+			self._points = points
+		return self._points
 	
 	def _set_points(self, points):
-		'''first makes sure that the GSPath.nodes has the right length, than sets the properties from points to nodes'''
-		while len(points) > self._object.nodes().count():
-			newNode = GSNode()
-			self._object.addNode_(newNode)
-		while len(points) < self._object.nodes().count():
-			self._object.removeNodeAtIndex_( 0 )
-		#assert(len(points) == self._object.nodes().count(), "The new point list and the path.nodes count should be equal")
-		for i in range(len(points)):
-			Node = self._object.nodeAtIndex_(i)
-			Node.setPosition_((points[i].x, points[i].y))
-			if points[i].type == MOVE:
+		'''builds a new list of nodes from the points and gives it to the GSPath in one go'''
+		Nodes = []
+		Open = False
+		for point in points:
+			# the nodes are not on a path yet, so setting them up does not send any notifications
+			Node = GSNode()
+			Node.setPosition_((point.x, point.y))
+			Type = point.type
+			if Type == MOVE:
 				Node.setType_( GSLINE )
-				self._object.setClosed_(False)
-			if points[i].type == LINE:
+				Open = True
+			elif Type == LINE:
 				Node.setType_( GSLINE )
-			if points[i].type == CURVE:
+			elif Type == CURVE:
 				Node.setType_( GSCURVE )
-			if points[i].type == OFFCURVE:
+			elif Type == OFFCURVE:
 				Node.setType_( GSOFFCURVE )
-			if points[i].smooth:
+			if point.smooth:
 				Node.setConnection_( GSSMOOTH )
 			else:
 				Node.setConnection_( GSSHARP )
+			Nodes.append(Node)
+		self._object.setNodes_(NSMutableArray.arrayWithArray_(Nodes))
+		if Open:
+			self._object.setClosed_(False)
+		self._invalidateData()
 	
 	points = property(_get_points, _set_points, doc="the contour as a list of points")
 	
@@ -836,55 +1106,81 @@ class RContour(BaseContour):
 	
 	def draw(self, pen):
 		"""draw the object with a fontTools pen"""
-		
-		if self._object.closed:
-			for i in range(len(self), -1, -1):
-				StartNode = self._object.nodeAtIndex_(i)
-				if StartNode.type != GSOFFCURVE:
-					pen.moveTo(StartNode.position)
-					break
+		Data = self._getData()
+		X = Data.x
+		Y = Data.y
+		Types = Data.types
+		Count = len(Types)
+		if Count == 0:
+			return
+		if Data.closed:
+			# the node before the first one, like GSPath.nodeAtIndex_ the index wraps around
+			StartIndexes = [0] + range(Count - 1, -1, -1)
 		else:
-			for i in range(len(self)):
-				StartNode = self._object.nodeAtIndex_(i)
-				if StartNode.type != GSOFFCURVE:
-					pen.moveTo(StartNode.position)
-					break
-		for i in range(len(self)):
-			Node = self._object.nodeAtIndex_(i)
-			if Node.type == GSLINE:
-				pen.lineTo(Node.position)
-			elif Node.type == GSCURVE:
-				pen.curveTo(self._object.nodeAtIndex_(i-2).position, self._object.nodeAtIndex_(i-1).position, Node.position)
-		if self._object.closed:
+			StartIndexes = range(Count)
+		for i in StartIndexes:
+			if Types[i] != GSOFFCURVE:
+				pen.moveTo((X[i], Y[i]))
+				break
+		for i in range(Count):
+			Type = Types[i]
+			if Type == GSLINE:
+				pen.lineTo((X[i], Y[i]))
+			elif Type == GSCURVE:
+				pen.curveTo((X[i-2], Y[i-2]), (X[i-1], Y[i-1]), (X[i], Y[i]))
+		if Data.closed:
 			pen.closePath()
 		else:
 			pen.endPath()
+	
+	def drawPoints(self, pen):
+		"""draw the object with a point pen"""
+		Data = self._getData()
+		X = Data.x
+		Y = Data.y
+		Types = Data.types
+		Smooth = Data.smooth
+		pen.beginPath()
+		for i in range(len(Types)):
+			Type = Types[i]
+			if Type == GSOFFCURVE:
+				segmentType = None
+			elif Type == GSCURVE:
+				segmentType = CURVE
+			else:
+				segmentType = LINE
+			if i == 0 and not Data.closed:
+				segmentType = MOVE
+			pen.addPoint((X[i], Y[i]), segmentType, bool(Smooth[i]))
+		pen.endPath()
 		
 	def _get_segments(self):
-		if not len(self._object.nodes):
-			return []
+		Data = self._getData()
+		if self._segments is not None:
+			return self._segments
 		segments = []
+		if not len(Data.nodes):
+			return segments
 		index = 0
-		node = None
-		for i in range(len(self._object.nodes)):
-			node = self._object.nodeAtIndex_(i)
-			if node.type == GSLINE or node.type == GSCURVE:
-				_Segment = RSegment(index, self, node)
+		Types = Data.types
+		for i in range(len(Types)):
+			if Types[i] == GSLINE or Types[i] == GSCURVE:
+				_Segment = RSegment(index, self, Data.nodes[i], i)
 				_Segment.parent = self
 				_Segment.index = index
 				segments.append(_Segment)
 				index += 1
-		if self._object.closed:
+		if Data.closed:
 			# TODO fix this out properly. 
 			# _Segment = RSegment(0, self, node)
 			# _Segment.type = MOVE
 			# segments.insert(0, _Segment)
 			pass
 		else:
-			_Segment = RSegment(0, self, self._object.nodeAtIndex_(0))
+			_Segment = RSegment(0, self, Data.nodes[0], 0)
 			_Segment.type = MOVE
 			segments.insert(0, _Segment)
-			
+		self._segments = segments
 		return segments
 	
 	def _set_segments(self, segments):
@@ -916,6 +1212,7 @@ class RContour(BaseContour):
 	def reverseContour(self):
 		"""reverse contour direction"""
 		self._object.reverse()
+		self._invalidateData()
 	
 	def setStartSegment(self, segmentIndex):
 		"""set the first segment on the contour"""
@@ -980,11 +1277,12 @@ class RContour(BaseContour):
 
 class RSegment(BaseSegment):
 	#def __init__(self, index, points=[], smooth = False):
-	def __init__(self, index, contoure, node):
+	def __init__(self, index, contoure, node, nodeIndex=None):
 		BaseSegment.__init__(self)
 		self._object = node
 		self.parent = contoure
 		self.index = index
+		self._nodeIndex = nodeIndex # the index of the node in the contour, if known
 		self.isMove = False # to store if the segment is a move segment
 	
 	def __repr__(self):
@@ -1082,6 +1380,15 @@ class RSegment(BaseSegment):
 		self._hasChanged()
 		
 	def _get_points(self):
+		if self._nodeIndex is not None and isinstance(self.parent, RContour):
+			points = self.parent.points
+			index = self._nodeIndex
+			nodeType = self.parent._getData().types[index]
+			if nodeType == GSCURVE:
+				return [points[index-2], points[index-1], points[index]]
+			elif nodeType == GSLINE:
+				return [points[index]]
+			return []
 		Path = self._object.parent
 		index = Path.indexOfNode_(self._object)
 		points = []
@@ -1203,8 +1510,11 @@ class RPoint(BasePoint):
 	
 	_title = "GlyphsPoint"
 	
-	def __init__(self, gs_point):
+	def __init__(self, gs_point, data=None, index=None):
 		self._object = gs_point;
+		self._data = data # the _ContourData of the contour and the index of the point in it, to read from
+		self._index = index
+		self.parent = None
 		self.isMove = False
 		# self.selected = False
 		self._type = False
@@ -1251,28 +1561,53 @@ class RPoint(BasePoint):
 		#return "<RPoint (%.1f, %.1f %s) for %s.%s[%d][%d]>"%( self._object.position.x, self._object.position.y, Type, FontName, GlyphName, pathIndex, nodeIndex)
 		return "<RPoint (%.1f, %.1f %s)>"%( self._object.position.x, self._object.position.y, Type)
 	
+	def _hasData(self):
+		return self._data is not None and self._data.valid
+	
+	def _pointChanged(self):
+		# the new value is written into the contour data as well, so the points and segments of
+		# the contour stay valid. Only the metrics of the glyph have to be read again.
+		if isinstance(self.parent, RContour):
+			glyph = self.parent.getParent()
+			if glyph is not None:
+				glyph._invalidateMetrics()
+	
 	def _get_x(self):
+		if self._hasData():
+			return self._data.x[self._index]
 		return self._object.x
 	
 	def _set_x(self, value):
-		self._object.setPosition_((value, self._object.position.y))
+		self._object.setPosition_((value, self.y))
+		if self._hasData():
+			self._data.x[self._index] = value
+		self._pointChanged()
 	
 	x = property(_get_x, _set_x, doc="")
 	
 	def _get_y(self):
+		if self._hasData():
+			return self._data.y[self._index]
 		return self._object.y
 	
 	def _set_y(self, value):
-		self._object.setPosition_((self._object.position.x, value))
+		self._object.setPosition_((self.x, value))
+		if self._hasData():
+			self._data.y[self._index] = value
+		self._pointChanged()
 	
 	y = property(_get_y, _set_y, doc="")
 	
 	def _get_type(self):
 		if self._type == MOVE:
 			return MOVE
-		elif self._object.type == GSOFFCURVE:
+		if self._hasData():
+			nodeType = self._data.types[self._index]
+		else:
+			nodeType = self._object.type
+		if nodeType == GSOFFCURVE:
 			return OFFCURVE
-		elif self._object.type == GSCURVE:
+		elif nodeType == GSCURVE:
 			return CURVE
 		else:
 			return LINE
@@ -1281,13 +1616,21 @@ class RPoint(BasePoint):
 		if value == MOVE:
 			self._type = value
 		elif value == LINE:
-			self._object.type = GSLINE
+			self._setNodeType(GSLINE)
 		elif value == OFFCURVE:
-			self._object.type = GSOFFCURVE
+			self._setNodeType(GSOFFCURVE)
 		elif value == CURVE:
-			self._object.type = GSCURVE
-		
+			self._setNodeType(GSCURVE)
+		if isinstance(self.parent, RContour):
+			# the points stay, but the segments depend on the types
+			self.parent._segments = None
+		self._pointChanged()
 		self._hasChanged()
+	
+	def _setNodeType(self, nodeType):
+		self._object.type = nodeType
+		if self._hasData():
+			self._data.types[self._index] = nodeType
 
 	type = property(_get_type, _set_type, doc="")
 	
@@ -1435,10 +1778,49 @@ class RKerning(BaseKerning):
 	_title = "RoboFabKerning"
 
 		
+def _groupsByGlyph(Groups):
+	# the glyph names with the names of the groups they are in
+	GroupsByGlyph = {}
+	for GroupName, GlyphNames in Groups.iteritems():
+		for GlyphName in GlyphNames:
+			GlyphGroups = GroupsByGlyph.setdefault(GlyphName, [])
+			if GroupName not in GlyphGroups:
+				GlyphGroups.append(GroupName)
+	return GroupsByGlyph
+
 class RGroups(BaseGroups):
 	
 	_title = "RoboFabGroups"
 	
+	def __init__(self, groups=None, groupsByGlyph=None):
+		BaseGroups.__init__(self)
+		if groups is not None:
+			for groupName, glyphNames in groups.iteritems():
+				BaseGroups.__setitem__(self, groupName, glyphNames)
+		self._groupsByGlyph = groupsByGlyph
+	
+	def _changed(self):
+		self._groupsByGlyph = None
+		# the groups of a font are shared by all readers, a changed copy is not theirs anymore.
+		# It is written to the font by setting font.groups.
+		font = self.getParent()
+		if font is not None and font._groups is self:
+			font._invalidateGroups()
+	
+	def __setitem__(self, groupName, glyphNames):
+		BaseGroups.__setitem__(self, groupName, glyphNames)
+		self._changed()
+	
+	def __delitem__(self, groupName):
+		BaseGroups.__delitem__(self, groupName)
+		self._changed()
+	
+	def groupsForGlyph(self, glyphName):
+		"""Return the names of the groups that contain the glyph. Changes to the glyph lists of a group are not seen."""
+		if self._groupsByGlyph is None:
+			self._groupsByGlyph = _groupsByGlyph(self)
+		return list(self._groupsByGlyph.get(glyphName, ()))
+	
 class RLib(BaseLib):
 	
 	_title = "RoboFabLib"
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""Tests for the host independent part of the conversion."""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import glyphsConvert
+
+class FeatureCodeTest(unittest.TestCase):
+
+	def setUp(self):
+		self.convertName = glyphsConvert.convertName
+		self.nice2Legacy = dict(glyphsConvert.Nice2Legacy)
+		glyphsConvert.convertName = True
+		glyphsConvert.Nice2Legacy.update({"A-cy": "afii10017", "b": "bee"})
+		glyphsConvert._LegacyNames.clear()
+
+	def tearDown(self):
+		glyphsConvert.convertName = self.convertName
+		glyphsConvert.Nice2Legacy.clear()
+		glyphsConvert.Nice2Legacy.update(self.nice2Legacy)
+		glyphsConvert._LegacyNames.clear()
+
+	def test_glyphNames(self):
+		Code = "pos A-cy b -50;\n\tsub [A-cy b]' x-y by b;"
+		self.assertEqual(glyphsConvert.featureCode(Code, set(["A-cy", "b"])), "pos afii10017 bee -50;\n\tsub [afii10017 bee]' x-y by bee;")
+
+	def test_numbers(self):
+		self.assertEqual(glyphsConvert.featureCode("pos A-cy b -50 1.5;"), "pos afii10017 bee -50 1.5;")
+
+	def test_classCodes(self):
+		Dict = {"classes": [{"name": "lc", "code": "b A-cy c-d"}]}
+		self.assertEqual(glyphsConvert.classCodes(Dict, set(["A-cy", "b"])), ["lc: bee afii10017 c-d"])
+
+class FeatureBlockTest(unittest.TestCase):
+
+	def setUp(self):
+		self.stdout = sys.stdout
+		sys.stdout = open(os.devnull, "w")
+
+	def tearDown(self):
+		sys.stdout.close()
+		sys.stdout = self.stdout
+
+	def test_block(self):
+		Body = "lookup L1 {\n\t\tsub f i by f_i; # } in a comment\n\t} L1;\n\tsub a by b; # \"quote\n\tname \"with } brace\";\n"
+		Text = "# before {\nfeature liga { # comment }\n\t" + Body + "} liga;\nfeature kern { pos a b 10; } kern;"
+		self.assertEqual(glyphsConvert._featureBlock(Text), "# comment }\n\t" + Body)
+
+	def test_nestedFeatures(self):
+		Text = "feature aalt { feature liga; lookup A { sub a by b; } A; } aalt;"
+		self.assertEqual(glyphsConvert._featureBlock(Text), "feature liga; lookup A { sub a by b; } A; ")
+
+	def test_noBlock(self):
+		self.assertEqual(glyphsConvert._featureBlock("sub a by b;"), None)
+		self.assertEqual(glyphsConvert._featureBlock("feature liga { sub a by b; } calt;"), None)
+		self.assertEqual(glyphsConvert._featureBlock("feature liga { sub a by b;"), None)
+
+	def test_featureDict(self):
+		self.assertEqual(glyphsConvert.featureDict("liga", "feature liga {\n sub a by b;\n} liga;"), {"name": "liga", "code": "sub a by b;\n"})
+		# without a proper block everything between the outer braces is used
+		self.assertEqual(glyphsConvert.featureDict("calt", "calt { sub a by b; } "), {"name": "calt", "code": "sub a by b;"})
+		self.assertEqual(glyphsConvert.featureDict("ss01", "sub a by b;"), None)
+
+class ComponentTest(unittest.TestCase):
+
+	def chain(self, Depth):
+		# g0 uses g1, g1 uses g2 ... each moved 1 unit to the right
+		Names = ["g%d" % i for i in range(Depth)]
+		Components = [[glyphsConvert.ComponentRecord(Names[i + 1], [(1, 1, 1, 0)])] for i in range(Depth - 1)] + [[]]
+		return Names, Components
+
+	def test_order(self):
+		Dependencies = [[1, 2], [2], [], [0]]
+		Order, Cycles = glyphsConvert.componentOrder(Dependencies)
+		self.assertEqual(sorted(Order), [0, 1, 2, 3])
+		for Index in range(len(Dependencies)):
+			for Base in Dependencies[Index]:
+				self.assertTrue(Order.index(Base) < Order.index(Index))
+		self.assertEqual(Cycles, set())
+
+	def test_deepOrder(self):
+		Depth = 20000
+		Order, Cycles = glyphsConvert.componentOrder([[i + 1] for i in range(Depth - 1)] + [[]])
+		self.assertEqual(Order, range(Depth - 1, -1, -1))
+		self.assertEqual(Cycles, set())
+
+	def test_deepNesting(self):
+		# deeper than the recursion limit
+		Depth = 1100
+		Names, Components = self.chain(Depth)
+		Changed, Nested, Cycles = glyphsConvert.flattenComponents(Names, Components, set())
+		Flat, Outlines = Changed[0]
+		self.assertEqual([(component.name, component.transforms) for component in Flat], [("g%d" % (Depth - 1), [(1, 1, Depth - 1, 0)])])
+		self.assertEqual(Outlines, [("g%d" % i, [(1, 1, i, 0)]) for i in range(1, Depth - 1)])
+		self.assertEqual(len(Changed), Depth - 2)
+		self.assertEqual(Nested, set(Names[:-2]))
+		self.assertEqual(Cycles, set())
+
+	def test_cycles(self):
+		Names = ["a", "b", "c", "x", "d"]
+		def component(Name):
+			return glyphsConvert.ComponentRecord(Name, [(1, 1, 0, 0)])
+		# a and b use each other, x uses itself, c uses a, d is fine
+		Components = [[component("b")], [component("a")], [component("a")], [component("x")], [component("c")]]
+		Order, Cycles = glyphsConvert.componentOrder([[Names.index(component.name) for component in Record] for Record in Components])
+		self.assertEqual(sorted(Order), range(len(Names)))
+		self.assertEqual(Cycles, set([0, 3]))
+		Changed, Nested, CycleNames = glyphsConvert.flattenComponents(Names, Components, set())
+		self.assertEqual(CycleNames, set(["a", "x"]))
+		# the glyphs in or on a cycle keep their components
+		self.assertEqual(Changed, {})
+
+GlyphData = """<?xml version="1.0" encoding="UTF-8"?>
+<glyphData>
+	<glyph name="A-cy" legacy="afii10017" category="Letter" subCategory="Uppercase"/>
+	<glyph name="gravecomb" category="Mark" subCategory="Nonspacing"/>
+</glyphData>
+"""
+
+class GlyphDataTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.cacheFolder = glyphsConvert.cacheFolder
+		glyphsConvert.cacheFolder = lambda: self.folder
+		self.tables = [(Table, dict(Table)) for Table in (glyphsConvert.Nice2Legacy, glyphsConvert.Name2Category, glyphsConvert.Name2SubCategory)]
+		self.stdout = sys.stdout
+		sys.stdout = open(os.devnull, "w")
+
+	def tearDown(self):
+		sys.stdout.close()
+		sys.stdout = self.stdout
+		glyphsConvert.cacheFolder = self.cacheFolder
+		for Table, Saved in self.tables:
+			Table.clear()
+			Table.update(Saved)
+		shutil.rmtree(self.folder)
+
+	def glyphDataPath(self, FolderName):
+		Folder = os.path.join(self.folder, FolderName)
+		os.mkdir(Folder)
+		Path = os.path.join(Folder, "GlyphData.xml")
+		File = open(Path, "w")
+		File.write(GlyphData)
+		File.close()
+		return Path
+
+	def test_bytePath(self):
+		# a user folder with an accent, as a UTF-8 byte path
+		Path = self.glyphDataPath("Sch\xc3\xb6n")
+		for i in range(2):
+			# the second time from the cache
+			glyphsConvert.Nice2Legacy.clear()
+			glyphsConvert.parseGlyphDataFile(Path)
+			self.assertEqual(glyphsConvert.Nice2Legacy.get("A-cy"), "afii10017")
+			self.assertEqual(glyphsConvert.Name2SubCategory.get("gravecomb"), "Nonspacing")
+
+	def test_unicodePath(self):
+		Path = self.glyphDataPath("Glyphs").decode("utf-8")
+		glyphsConvert.parseGlyphDataFile(Path)
+		self.assertEqual(glyphsConvert.Name2Category.get("A-cy"), "Letter")
+
+	def test_missing(self):
+		# reported, not raised
+		self.assertEqual(glyphsConvert.parseGlyphDataFile(os.path.join(self.folder, "GlyphData.xml")), None)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""Tests for reading and writing the .glyphs plist format."""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import glyphsFormat
+from glyphsFormat import PlistWriter, PlistText, PlistData, parsePlist, readGlyphsDocument, writeGlyphsDocument, decodeNodes
+
+def writePlist(Value):
+	File = StringIO()
+	PlistWriter(File).write(Value)
+	return File.getvalue()
+
+Document = """{
+.appVersion = "895";
+// a comment
+familyName = "Test \\"Quoted\\" Sans";
+glyphs = (
+{
+glyphname = A;
+/* a comment with { and ( */
+layers = ();
+},
+{
+glyphname = "a.sc";
+note = "braces } in a string )";
+},
+{
+glyphname = b;
+}
+);
+unitsPerEm = 1000;
+}
+"""
+
+class TokenizerTest(unittest.TestCase):
+
+	def test_values(self):
+		Dict = parsePlist('''{
+		// comment
+		a = "say \\"hi\\"\\012back\\\\slash \\U00E9";
+		b = @MMK_L_A;
+		c = -12.5;
+		d = ();
+		e = {};
+		f = ("1 2 LINE", "3 4 CURVE SMOOTH");
+		g = ({x = 1;}, (), "s");
+		/* comment */ h = "";
+		i = (a, b,);
+		}''')
+		self.assertEqual(Dict["a"], u'say "hi"\nback\\slash \xe9')
+		self.assertEqual(Dict["b"], "@MMK_L_A")
+		self.assertEqual(Dict["c"], "-12.5")
+		self.assertEqual(Dict["d"], [])
+		self.assertEqual(Dict["e"], {})
+		self.assertEqual(Dict["f"], ["1 2 LINE", "3 4 CURVE SMOOTH"])
+		self.assertEqual(Dict["g"], [{"x": "1"}, [], "s"])
+		self.assertEqual(Dict["h"], "")
+		self.assertEqual(Dict["i"], ["a", "b"])
+
+	def test_utf8(self):
+		self.assertEqual(parsePlist('{name = "Caf\xc3\xa9";}'), {"name": u"Caf\xe9"})
+
+	def test_errors(self):
+		for Text in ('{a = 1}', '{a 1;}', '{a = (1 2);}', '{a = "open;}', '{a = 1;'):
+			self.assertRaises(ValueError, parsePlist, Text)
+
+	def test_glyphList(self):
+		Folder = tempfile.mkdtemp()
+		try:
+			Path = os.path.join(Folder, "Test.glyphs")
+			File = open(Path, "wb")
+			File.write(Document)
+			File.close()
+			Doc = readGlyphsDocument(Path)
+			try:
+				self.assertEqual(Doc["familyName"], u'Test "Quoted" Sans')
+				self.assertEqual(Doc["unitsPerEm"], "1000")
+				Glyphs = Doc["glyphs"]
+				self.assertEqual(len(Glyphs), 3)
+				self.assertEqual(Glyphs[2], {"glyphname": "b"})
+				self.assertEqual(Glyphs[1]["note"], "braces } in a string )")
+				self.assertEqual([Glyph["glyphname"] for Glyph in Glyphs], ["A", "a.sc", "b"])
+				self.assertEqual(Glyphs.text(2), "{\nglyphname = b;\n}")
+			finally:
+				Doc.close()
+		finally:
+			shutil.rmtree(Folder)
+
+class NodesTest(unittest.TestCase):
+
+	def test_decode(self):
+		X, Y, Types, Smooth = decodeNodes(["10 -20 LINE", "1.5 2e1 OFFCURVE", "-3 4 OFFCURVE", "+5 6.25 CURVE SMOOTH", "7 8 QCURVE"])
+		self.assertEqual(list(X), [10, 1.5, -3, 5, 7])
+		self.assertEqual(list(Y), [-20, 20, 4, 6.25, 8])
+		self.assertEqual(list(Types), [glyphsFormat.LINE, glyphsFormat.OFFCURVE, glyphsFormat.OFFCURVE, glyphsFormat.CURVE, glyphsFormat.QCURVE])
+		self.assertEqual(list(Smooth), [0, 0, 0, 1, 0])
+
+	def test_empty(self):
+		self.assertEqual([len(Column) for Column in decodeNodes([])], [0, 0, 0, 0])
+
+	def test_invalid(self):
+		self.assertRaises(ValueError, decodeNodes, ["10 20 LINE", "10 20"])
+		self.assertRaises(ValueError, decodeNodes, ["10 20 MOVE"])
+
+class WriterTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def test_roundTrip(self):
+		Dict = {
+			".appVersion": "895",
+			"familyName": u'Say "Caf\xe9" \\ \u4e2d',
+			"note": u"tab\tnew line\nbell\a",
+			"empty": "",
+			"emptyList": [],
+			"emptyDict": {},
+			"nested": [{}, [], [[]], {"a": []}],
+			"nodes": ["1 2 LINE", "3 4 CURVE SMOOTH"],
+			"data": PlistData("\x00\x01binary"),
+			"punctuation": "a-b c;d{e}f(g)h=i,j",
+		}
+		Text = writePlist(Dict)
+		self.assertEqual(parsePlist(Text), Dict)
+		self.assertEqual(writePlist(parsePlist(Text)), Text)
+
+	def test_numbers(self):
+		self.assertEqual(writePlist({"a": 1, "b": 2.0, "c": 2.5, "d": True}), "{\na = 1;\nb = 2;\nc = 2.5;\nd = 1;\n}")
+
+	def test_streaming(self):
+		Made = []
+		def glyphs():
+			for Name in ("A", "B", "C"):
+				Made.append(Name)
+				if Name == "B":
+					# the text of a glyph from an earlier export is written as it is
+					yield PlistText("{\nglyphname = B;\nnote = \"kept\";\n}")
+				else:
+					yield {"glyphname": Name}
+		Path = os.path.join(self.folder, "Stream.glyphs")
+		Offsets = writeGlyphsDocument(Path, {"familyName": "Stream", "glyphs": glyphs()})
+		self.assertEqual(Made, ["A", "B", "C"])
+		Doc = readGlyphsDocument(Path)
+		try:
+			Glyphs = Doc["glyphs"]
+			self.assertEqual(Offsets, Glyphs._spans)
+			self.assertEqual([Glyph["glyphname"] for Glyph in Glyphs], ["A", "B", "C"])
+			self.assertEqual(Glyphs[1]["note"], "kept")
+		finally:
+			Doc.close()
+
+	def test_emptyStream(self):
+		Path = os.path.join(self.folder, "Empty.glyphs")
+		self.assertEqual(writeGlyphsDocument(Path, {"glyphs": iter([])}), [])
+		Doc = readGlyphsDocument(Path)
+		try:
+			self.assertEqual(len(Doc["glyphs"]), 0)
+		finally:
+			Doc.close()
+
+	def test_failedWrite(self):
+		# the old file stays when the writing fails
+		Path = os.path.join(self.folder, "Old.glyphs")
+		writeGlyphsDocument(Path, {"familyName": "Old"})
+		def glyphs():
+			yield {"glyphname": "A"}
+			raise RuntimeError("stop")
+		self.assertRaises(RuntimeError, writeGlyphsDocument, Path, {"glyphs": glyphs()})
+		self.assertEqual(os.listdir(self.folder), ["Old.glyphs"])
+		self.assertEqual(parsePlist(open(Path).read()), {"familyName": "Old"})
+
+class PlistDataTest(unittest.TestCase):
+
+	def test_data(self):
+		Dict = parsePlist("{blob = <48656c6c 6f>;\nempty = <>;\n}")
+		self.assertEqual(Dict["blob"], "Hello")
+		self.assertTrue(isinstance(Dict["blob"], PlistData))
+		self.assertEqual(writePlist(Dict), "{\nblob = <48656c6c6f>;\nempty = <>;\n}")
+
+	def test_dataRoundTrip(self):
+		Dict = {"userData": {"blob": PlistData("\x00\xff<>\"")}, "name": "<48>"}
+		Again = parsePlist(writePlist(Dict))
+		self.assertEqual(Again, Dict)
+		self.assertTrue(isinstance(Again["userData"]["blob"], PlistData))
+		self.assertFalse(isinstance(Again["name"], PlistData))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""The incremental export and import have to give the same result as the full ones."""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import memoryFL
+import glyphsFL
+from glyphsFormat import readGlyphsDocument, writeGlyphsDocument
+from glyphsManifest import ExportManifest, ImportManifest
+from glyphsStats import Stats
+from test_roundtrip import DataFolder, importFile, fontSummary
+
+def exportFile(Font, Path, Incremental):
+	"""Export Font to Path, returns the statistics."""
+	memoryFL.fl.font = Font
+	Statistics = Stats("export")
+	Manifest = None
+	if Incremental:
+		Manifest = ExportManifest(Path)
+	try:
+		Offsets = writeGlyphsDocument(Path, glyphsFL.writeFeatures(Font, glyphsFL.makePlist(Font, Statistics, Manifest)))
+		if Manifest is not None:
+			Manifest.save(Offsets)
+	finally:
+		if Manifest is not None:
+			Manifest.close()
+	return Statistics
+
+class IncrementalTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.stdout = sys.stdout
+		sys.stdout = open(os.devnull, "w")
+
+	def tearDown(self):
+		sys.stdout.close()
+		sys.stdout = self.stdout
+		shutil.rmtree(self.folder)
+
+	def path(self, Name):
+		return os.path.join(self.folder, Name)
+
+class IncrementalExportTest(IncrementalTest):
+
+	def assertSameExport(self, Font):
+		"""Export Font completely and incrementally, returns the statistics of the incremental export."""
+		exportFile(Font, self.path("Full.glyphs"), False)
+		Statistics = exportFile(Font, self.path("Incremental.glyphs"), True)
+		self.assertEqual(open(self.path("Incremental.glyphs"), "rb").read(), open(self.path("Full.glyphs"), "rb").read())
+		return Statistics
+
+	def test_export(self):
+		Font = importFile(os.path.join(DataFolder, "RoundTrip.glyphs"))
+		GlyphCount = len(Font.glyphs)
+		Statistics = self.assertSameExport(Font)
+		self.assertEqual(Statistics.counters.get("reused glyphs", 0), 0)
+		Statistics = self.assertSameExport(Font)
+		self.assertEqual(Statistics.counters.get("reused glyphs", 0), GlyphCount)
+		# a changed outline and width, and a new kerning pair
+		glyph = Font["B"]
+		glyph.nodes[1].Layer(0)[0].x += 7
+		glyph.SetMetrics(memoryFL.Point(555, 0), 0)
+		Font["space"].kerning.append(memoryFL.KerningPair(Font.FindGlyph("A"), -33))
+		Statistics = self.assertSameExport(Font)
+		self.assertEqual(Statistics.counters.get("reused glyphs", 0), GlyphCount - 1)
+
+	def test_changedFile(self):
+		# the manifest is not used for a file that changed after the export
+		Font = importFile(os.path.join(DataFolder, "RoundTrip.glyphs"))
+		self.assertSameExport(Font)
+		os.utime(self.path("Incremental.glyphs"), (1, 1))
+		Statistics = self.assertSameExport(Font)
+		self.assertEqual(Statistics.counters.get("reused glyphs", 0), 0)
+
+class IncrementalImportTest(IncrementalTest):
+
+	def setUp(self):
+		IncrementalTest.setUp(self)
+		self.text = open(os.path.join(DataFolder, "RoundTrip.glyphs"), "rb").read()
+
+	def writeFile(self, Text):
+		Path = self.path("RoundTrip.glyphs")
+		File = open(Path, "wb")
+		File.write(Text)
+		File.close()
+		return Path
+
+	def importText(self, Text):
+		"""Import Text completely, returns the font and the state saved in the manifest."""
+		Path = self.writeFile(Text)
+		GlyphsDoc = readGlyphsDocument(Path)
+		try:
+			Font = memoryFL.Font()
+			State = {}
+			self.assertTrue(glyphsFL.importGlyphsDocument(Font, GlyphsDoc, Stats("import"), State))
+		finally:
+			GlyphsDoc.close()
+		ImportManifest(Path).write(State)
+		return Font, State
+
+	def updateText(self, Font, Text):
+		"""Apply Text to the font of the last import. Returns the result and the new state."""
+		Path = self.writeFile(Text)
+		State = ImportManifest(Path).read()
+		GlyphsDoc = readGlyphsDocument(Path)
+		try:
+			Result = glyphsFL.updateGlyphsDocument(Font, GlyphsDoc, State, Stats("import"))
+		finally:
+			GlyphsDoc.close()
+		return Result, State
+
+	def assertSameImport(self, *Changes):
+		Text = self.text
+		for Old, New in Changes:
+			self.assertEqual(Text.count(Old), 1, Old)
+			Text = Text.replace(Old, New)
+		Font, State = self.importText(self.text)
+		Result, State = self.updateText(Font, Text)
+		self.assertTrue(Result)
+		Full, FullState = self.importText(Text)
+		self.assertEqual(fontSummary(Font), fontSummary(Full))
+		self.assertEqual(State, FullState)
+
+	def test_unchanged(self):
+		self.assertSameImport()
+
+	def test_outline(self):
+		# grave is also a component of Agrave
+		self.assertSameImport(('"50 850 LINE"', '"55 850 LINE"'))
+
+	def test_width(self):
+		self.assertSameImport(("width = 560;", "width = 570;"))
+
+	def test_kerning(self):
+		self.assertSameImport(("B = -20;", "B = -25;"), ('"@MMK_R_A" = -15;', '"@MMK_R_A" = -5;\nspace = 12;'))
+
+	def test_group(self):
+		self.assertSameImport(("glyphname = Agrave;\nleftKerningGroup = A;", "glyphname = Agrave;\nleftKerningGroup = Agrave;"))
+
+	def test_fallback(self):
+		# a changed feature needs a full import, the font is not touched
+		Font, State = self.importText(self.text)
+		Before = fontSummary(Font)
+		Result, State = self.updateText(Font, self.text.replace("sub A grave by Agrave;", "sub A by Agrave;"))
+		self.assertFalse(Result)
+		self.assertEqual(fontSummary(Font), Before)
+
+	def test_otherFont(self):
+		Font, State = self.importText(self.text)
+		del Font.glyphs[4]
+		Result, State = self.updateText(Font, self.text)
+		self.assertFalse(Result)
+
+if __name__ == "__main__":
+	unittest.main()
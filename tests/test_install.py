@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""The README has to list every module the FontLab macros need."""
+
+import os
+import re
+import ast
+import unittest
+
+Folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+Macros = ["Glyphs Import.py", "Glyphs Export.py"]
+
+def importedModules(Path):
+	"""The modules of this folder that the file imports, also through the modules it imports."""
+	Found = set()
+	Paths = [Path]
+	while Paths:
+		Tree = ast.parse(open(Paths.pop()).read())
+		for Node in ast.walk(Tree):
+			if isinstance(Node, ast.Import):
+				Names = [Alias.name for Alias in Node.names]
+			elif isinstance(Node, ast.ImportFrom) and Node.module:
+				Names = [Node.module]
+			else:
+				continue
+			for Name in Names:
+				ModulePath = os.path.join(Folder, Name + ".py")
+				if Name not in Found and os.path.isfile(ModulePath):
+					Found.add(Name)
+					Paths.append(ModulePath)
+	return Found
+
+class ReadmeTest(unittest.TestCase):
+
+	def test_modules(self):
+		Text = open(os.path.join(Folder, "README.txt")).read()
+		Line = [Line for Line in Text.splitlines() if Line.startswith("They need the modules")][0]
+		Listed = set(Name[:-3] for Name in re.findall(r'"([^"]+\.py)"', Line))
+		for Macro in Macros:
+			Needed = importedModules(os.path.join(Folder, Macro))
+			# memoryFL is the stand-in for FL and only used without FontLab
+			Needed.discard("memoryFL")
+			self.assertEqual(Needed - Listed, set(), "%s needs modules the README does not list" % Macro)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Import -> export -> import of a .glyphs file with the memoryFL stand-in.
+
+	python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import memoryFL
+import glyphsFL
+from glyphsFormat import readGlyphsDocument, writeGlyphsDocument
+
+DataFolder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+def importFile(Path):
+	GlyphsDoc = readGlyphsDocument(Path)
+	try:
+		Font = memoryFL.Font()
+		if not glyphsFL.importGlyphsDocument(Font, GlyphsDoc):
+			raise ValueError("The font can not be converted.")
+	finally:
+		GlyphsDoc.close()
+	return Font
+
+def exportFile(Font, Path):
+	memoryFL.fl.font = Font
+	writeGlyphsDocument(Path, glyphsFL.writeFeatures(Font, glyphsFL.makePlist(Font)))
+
+def fontSummary(Font):
+	"""What has to survive a round trip. The start node of a contour and the order of the zones may change."""
+	MasterCount = Font[0].layers_number
+	Glyphs = []
+	for glyph in Font.glyphs:
+		Dump = glyph.dump()
+		Nodes = sorted((node.type != memoryFL.nCURVE, [[(p.x, p.y) for p in node.Layer(m)][0] for m in range(MasterCount)]) for node in glyph.nodes)
+		Glyphs.append((Dump["name"], Dump["unicode"], Dump["widths"], len(glyph.nodes), Nodes, Dump["components"], sorted(Dump["anchors"]), sorted(Dump["kerning"])))
+	Classes = [(Font.classes[i], Font.GetClassLeft(i), Font.GetClassRight(i)) for i in range(len(Font.classes))]
+	return {
+		"family_name": Font.family_name,
+		"upm": Font.upm,
+		"glyphs": Glyphs,
+		"classes": Classes,
+		"features": [feature.tag for feature in Font.features],
+		"zones": [sorted(Font.blue_values[m][:Font.blue_values_num]) for m in range(MasterCount)],
+	}
+
+class RoundTripTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.stdout = sys.stdout
+		sys.stdout = open(os.devnull, "w")
+
+	def tearDown(self):
+		sys.stdout.close()
+		sys.stdout = self.stdout
+		shutil.rmtree(self.folder)
+
+	def test_roundTrip(self):
+		Font = importFile(os.path.join(DataFolder, "RoundTrip.glyphs"))
+		Path = os.path.join(self.folder, "RoundTrip.glyphs")
+		exportFile(Font, Path)
+		Again = importFile(Path)
+		self.assertEqual(fontSummary(Font), fontSummary(Again))
+
+	def test_contents(self):
+		Font = importFile(os.path.join(DataFolder, "RoundTrip.glyphs"))
+		self.assertEqual([glyph.name for glyph in Font.glyphs], ["A", "B", "grave", "Agrave", "space"])
+		self.assertEqual(Font["Agrave"].components[1].index, Font.FindGlyph("grave"))
+		self.assertEqual(Font["Agrave"].components[1].deltas[1].x, 220)
+		self.assertEqual([Font["B"].GetMetrics(m).x for m in range(2)], [560, 600])
+		self.assertTrue(len(Font["A"].kerning) + len(Font["B"].kerning) > 0)
+
+if __name__ == "__main__":
+	unittest.main()